@@ -1,37 +1,64 @@
 """ this module runs the long-term hourly load forecasting NN model """
 
-import tensorflow as tf  # type: ignore
-
 from config import FORECAST_OPTIONS_OBJECT as opts
-from model.model import run_model
-from preprocessing.extract_data import DataExtract
-from preprocessing.scaler import scale_data
+from model.baseline import BASELINE_MODELS, run_baseline
+from model.model import can_fine_tune, interactive_plots, run_fine_tune, run_model
+from model.performance import configure_runtime, get_performance_opts
+from model.reporting import write_report
+from preprocessing.pipeline import (
+    load_scaled_data,
+    make_fine_tune_dataset,
+    make_windowed_datasets,
+)
+from preprocessing.scaler import load_scaler
 from preprocessing.train_test_splits import train_test_split
-from preprocessing.windowing import windowed_dataset_factory
 
-# extract and load data
-data_extractor = DataExtract()
+# the report renders in spawned processes, which re-import this module
+if __name__ == "__main__":
+    # thread pools and precision policy must be set before any TF op runs
+    configure_runtime(get_performance_opts(opts))
 
-data_extractor.extract_data()
+    # fine-tuning keeps the scaler of the last full training run fixed
+    warm_start = can_fine_tune(opts)
 
-model_data = data_extractor.load_data_from_parquet(opts)
+    # extract, load and scale data
+    (scaled_model_data, scaler) = load_scaled_data(
+        opts, load_scaler(opts) if warm_start else None
+    )
 
-# scale data
-(scaled_model_data, scaler) = scale_data(model_data, opts)
+    # split data
+    (train_data, test_data) = train_test_split(scaled_model_data, opts)
 
-# split data
-(train_data, test_data) = train_test_split(scaled_model_data, opts)
+    if opts["model"] in BASELINE_MODELS:
+        # the NumPy baselines score every window at once, without tf.data
+        run_baseline(opts, train_data, test_data)
+    else:
+        # preprocess windows and look-ahead horizons
+        (windowed_training_dataset, windowed_test_dataset) = make_windowed_datasets(
+            train_data, test_data, opts
+        )
 
-# preprocess windows and look-ahead horizons
-train_dataset = tf.data.Dataset.from_tensor_slices(train_data)
-test_dataset = tf.data.Dataset.from_tensor_slices(test_data)
+        # warm start, unless validation loss has drifted since the last full run
+        fine_tuned = warm_start and run_fine_tune(
+            opts,
+            make_fine_tune_dataset(train_data, opts),
+            windowed_test_dataset,
+            scaler,
+        )
 
-windowing = windowed_dataset_factory(
-    opts["window_opts"], features=(1 + len(opts["additional_features"]))
-)
+        if warm_start and not fine_tuned:
+            # full retraining refits the scaler on the current data
+            (scaled_model_data, scaler) = load_scaled_data(opts)
+            (train_data, test_data) = train_test_split(scaled_model_data, opts)
+            (
+                windowed_training_dataset,
+                windowed_test_dataset,
+            ) = make_windowed_datasets(train_data, test_data, opts)
 
-windowed_training_dataset = windowing.make_windows(train_dataset)
-windowed_test_dataset = windowing.make_windows(test_dataset)
+        # run model
+        if not fine_tuned:
+            run_model(opts, windowed_training_dataset, windowed_test_dataset, scaler)
 
-# run model
-run_model(opts, windowed_training_dataset, windowed_test_dataset, scaler)
+    # headless diagnostic plots instead of the interactive one
+    if not interactive_plots(opts):
+        write_report(scaled_model_data, scaler, opts)
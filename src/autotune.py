@@ -0,0 +1,76 @@
+""" this module times short training runs with each candidate performance profile
+and writes the fastest one for this machine to the out folder """
+
+import json
+import multiprocessing
+import os
+from typing import List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from config import PERFORMANCE_PROFILE_PATH
+from custom_types import PerformanceOpts
+from model.autotune import candidate_profiles, input_pipeline_profiles, time_profile
+from model.performance import get_performance_opts
+from preprocessing.pipeline import load_scaled_data
+from preprocessing.train_test_splits import train_test_split
+
+AUTOTUNE_STEPS = 64  # training batches per timed epoch
+
+
+def fastest_profile(
+    profiles: List[PerformanceOpts], rows: npt.NDArray
+) -> Tuple[float, PerformanceOpts]:
+    """time each profile in a fresh process
+    Args:
+      profiles:     performance profiles to try
+      rows:     scaled training rows for the timed batches
+    Returns:
+      (seconds per step, profile) of the fastest one
+    """
+
+    results = []
+    spawn_context = multiprocessing.get_context("spawn")
+    for perf in profiles:
+        # oneDNN is read when TF is imported, so each trial needs a fresh process
+        os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if perf["onednn_opts"] else "0"
+        with spawn_context.Pool(1) as pool:
+            seconds_per_step = pool.apply(
+                time_profile, (perf, opts, rows, AUTOTUNE_STEPS)
+            )
+        print(f"{seconds_per_step * 1000:8.2f} ms/step  {perf}")
+        results.append((seconds_per_step, perf))
+
+    return min(results, key=lambda result: result[0])
+
+
+if __name__ == "__main__":
+    (scaled_model_data, _) = load_scaled_data(opts)
+    (train_data, _) = train_test_split(scaled_model_data, opts)
+
+    # only enough rows for the timed batches are passed to the trial processes
+    window_opts = opts["window_opts"]
+    n_rows = (
+        AUTOTUNE_STEPS * window_opts["batch_size"]
+        + window_opts["window"]
+        + window_opts["horizon"]
+    )
+    train_rows = np.asarray(train_data, dtype=np.float32)[:n_rows]
+
+    # compute settings first, then the tf.data settings on the fastest of them
+    (_, best_compute) = fastest_profile(
+        candidate_profiles(get_performance_opts(opts)), train_rows
+    )
+    (best_seconds_per_step, best_perf) = fastest_profile(
+        input_pipeline_profiles(best_compute), train_rows
+    )
+
+    with open(PERFORMANCE_PROFILE_PATH, "w", encoding="utf-8") as profile_file:
+        json.dump(best_perf, profile_file, indent=4)
+
+    print(
+        f"fastest profile ({best_seconds_per_step * 1000:.2f} ms/step) "
+        f"written to {PERFORMANCE_PROFILE_PATH}"
+    )
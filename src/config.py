@@ -1,14 +1,27 @@
 """ Misc. configuration settings for the forecast program """
+import json
 import os
 
 from dotenv.main import load_dotenv
 
-from custom_types import LoadForecastOptions
+from custom_types import LoadForecastOptions, PerformanceOpts
 
 load_dotenv()
 
 # forecast options
 
+# TF runtime defaults, also used for options objects without a performance block
+DEFAULT_PERFORMANCE: PerformanceOpts = {
+    "jit_compile": False,
+    "steps_per_execution": 1,
+    "intra_op_threads": 0,  # 0 -> let TensorFlow decide
+    "inter_op_threads": 0,
+    "deterministic": True,
+    "private_threadpool_size": 0,
+    "mixed_bfloat16": False,
+    "onednn_opts": True,
+}
+
 FORECAST_OPTIONS_OBJECT: LoadForecastOptions = {
     "zone": "DOM",
     "train_test_dates": {
@@ -35,6 +48,67 @@ FORECAST_OPTIONS_OBJECT: LoadForecastOptions = {
     "es_patience": 100,
     "lr_patience": 50,
     "additional_features": ["dayofweek", "dayofyear", "sin_year", "sin_day", "hour"],
+    "repair_index": True,  # fix duplicated/missing/out-of-order hours before windowing
+    "performance": DEFAULT_PERFORMANCE.copy(),  # overridden by the autotune profile
+    "cross_validation": {  # used by `python src/cross_validate.py`
+        "folds": 4,
+        "mode": "expanding",  # or "rolling" for a fixed-length training window
+        "workers": 4,  # one process per fold, at most
+    },
+    "model_params": {"filters": 128, "dense_units": 512, "lstm_units": 16},
+    "search": {  # used by `python src/search.py`
+        "max_epochs": 81,  # epochs given to the trials that survive every rung
+        "eta": 3,  # keep the best 1/eta trials at each rung
+        "workers": 4,
+        "seed": 0,
+        "space": {
+            "filters": [32, 64, 128],
+            "dense_units": [128, 256, 512],
+            "lstm_units": [8, 16, 32],
+            "window": [24 * 3, 24 * 7, 24 * 14],
+            "horizon": [24 * 7],
+        },
+    },
+    "fine_tune": {  # warm start from the saved model, scaler and reference loss
+        "enabled": False,
+        "epochs": 5,
+        "learning_rate": 0.0001,
+        "recent_hours": 24 * 7 * 4,  # newest training windows always used
+        "replay_fraction": 1.0,  # older windows sampled, relative to recent ones
+        "drift_threshold": 0.25,  # val loss increase that triggers full retraining
+    },
+    "distributed": {  # used by `python src/train_distributed.py`
+        "strategy": "multi_worker",  # localhost worker processes, or "mirrored"
+        "workers": 4,  # batch size and learning rate are scaled by this
+        "base_port": 20000,  # multi_worker listens on base_port + worker index
+        "seed": 42,  # shuffle seed shared by every worker, so shards are disjoint
+    },
+    "checkpoint": {
+        "asynchronous": True,  # False -> synchronous full-model .hdf5 checkpoint
+        "keep_last": 3,
+        "save_freq_steps": 0,  # > 0 also checkpoints every N steps (preemption)
+    },
+    "export": {  # used by `python src/export_forecasts.py`
+        "zones": ["DOM"],
+        "issue_start": {"year": 2016, "month": 1, "day": 1, "hour": 0},
+        "issue_end": {"year": 2016, "month": 12, "day": 31, "hour": 23},
+        "issue_stride": 1,  # a forecast issued every hour
+        "batch_size": 1024,
+    },
+    "report": {  # written to out/report/{model}{zone}
+        "headless": True,
+        "samples": 200,
+        "workers": 4,
+    },
+    "streaming": {"chunk_rows": 2**16},  # used by `python src/train_streaming.py`
+    "student": {  # used by `python src/distill.py`, served with "model": "student"
+        "teacher": "lstm",
+        "architecture": "tcn",  # dilated causal CNN, or "mlp" on downsampled lags
+        "filters": 16,
+        "hidden_units": 128,
+        "downsample": 4,
+        "alpha": 1.0,  # 1.0 -> pure teacher targets, 0.0 -> actuals only
+    },
 }
 
 
@@ -59,3 +133,18 @@ PARQUET_ORIGINAL_FILENAME = (
 )
 
 PARQUET_FILENAME = "est_hourly.parquet"
+
+# headless diagnostic plots and their HTML index
+REPORT_OUT_PATH = os.path.join(MODEL_OUT_PATH, "report")
+
+# hive-partitioned (zone, issue_date) forecast dataset
+FORECAST_EXPORT_PATH = os.path.join(MODEL_OUT_PATH, "forecasts")
+
+# machine-specific performance profile written by `python src/autotune.py`
+PERFORMANCE_PROFILE_FILENAME = "performance_profile.json"
+
+PERFORMANCE_PROFILE_PATH = os.path.join(MODEL_OUT_PATH, PERFORMANCE_PROFILE_FILENAME)
+
+if os.path.exists(PERFORMANCE_PROFILE_PATH):
+    with open(PERFORMANCE_PROFILE_PATH, "r", encoding="utf-8") as profile_file:
+        FORECAST_OPTIONS_OBJECT["performance"] = json.load(profile_file)
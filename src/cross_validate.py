@@ -0,0 +1,25 @@
+""" this module runs rolling/expanding-origin cross-validation of the forecast model
+and writes the per-fold and aggregate metrics to the out folder """
+
+import json
+import os
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from config import MODEL_OUT_PATH
+from model.cross_validation import cross_validate
+from preprocessing.pipeline import load_scaled_data
+
+if __name__ == "__main__":
+    (scaled_model_data, _) = load_scaled_data(opts)
+
+    cv_results = cross_validate(scaled_model_data, opts)
+
+    for name, summary in cv_results["aggregate"].items():  # type: ignore
+        print(f"{name}: {summary['mean']:.5f} +/- {summary['std']:.5f}")
+
+    with open(
+        os.path.join(MODEL_OUT_PATH, f"cv_{opts['model']}{opts['zone']}.json"),
+        "w",
+        encoding="utf-8",
+    ) as results_file:
+        json.dump(cv_results, results_file, indent=4)
@@ -41,6 +41,124 @@ class WindowedDatasetOpts(TypedDict):
     horizon: int
     batch_size: int
     shuffle_buffer_size: NotRequired[int]
+    shuffle_seed: NotRequired[int]
+
+
+class PerformanceOpts(TypedDict):
+    """options for CPU training/inference performance
+    thread counts of 0 let TensorFlow pick; oneDNN is read by TensorFlow at import
+    time, so `onednn_opts` only takes effect through the TF_ENABLE_ONEDNN_OPTS
+    environment variable (the autotune command sets it for each trial)
+    """
+
+    jit_compile: bool
+    steps_per_execution: int
+    intra_op_threads: int
+    inter_op_threads: int
+    deterministic: bool
+    private_threadpool_size: int
+    mixed_bfloat16: bool
+    onednn_opts: bool
+
+
+class CrossValidationOpts(TypedDict):
+    """options for rolling/expanding-origin cross-validation"""
+
+    folds: int
+    mode: Literal["expanding", "rolling"]
+    workers: int
+    threads_per_worker: NotRequired[int]
+
+
+class ModelParams(TypedDict):
+    """layer sizes for the cnn and lstm models"""
+
+    filters: NotRequired[int]
+    dense_units: NotRequired[int]
+    lstm_units: NotRequired[int]
+
+
+class SearchSpace(TypedDict):
+    """candidate values sampled by the hyperparameter search"""
+
+    filters: List[int]
+    dense_units: List[int]
+    lstm_units: List[int]
+    window: List[int]
+    horizon: List[int]
+
+
+class SearchOpts(TypedDict):
+    """options for the Hyperband hyperparameter search"""
+
+    max_epochs: int
+    eta: int
+    workers: int
+    seed: int
+    space: SearchSpace
+
+
+class FineTuneOpts(TypedDict):
+    """options for warm-start retraining from the last saved model"""
+
+    enabled: bool
+    epochs: int
+    learning_rate: float
+    recent_hours: int
+    replay_fraction: float
+    drift_threshold: float
+
+
+class DistributedOpts(TypedDict):
+    """options for data-parallel training on the local machine"""
+
+    strategy: Literal["multi_worker", "mirrored"]
+    workers: int
+    base_port: int
+    seed: int
+
+
+class CheckpointOpts(TypedDict):
+    """options for saving the best model during training"""
+
+    asynchronous: bool  # weights-only .npz files written on a background thread
+    keep_last: int
+    save_freq_steps: int  # 0 -> only checkpoint on val loss improvement
+
+
+class ExportOpts(TypedDict):
+    """options for the bulk forecast export"""
+
+    zones: List[Literal["DOM", "PJME"]]
+    issue_start: DtIntervalSelection
+    issue_end: DtIntervalSelection
+    issue_stride: int  # intervals between consecutive issue times
+    batch_size: int  # issue times predicted (and written) per record batch
+
+
+class ReportOpts(TypedDict):
+    """options for the headless diagnostic report"""
+
+    headless: bool  # replaces the interactive plot after training
+    samples: int  # predicted-vs-actual plots, evenly spaced over the test windows
+    workers: int
+
+
+class StreamingOpts(TypedDict):
+    """options for out-of-core training on data larger than RAM"""
+
+    chunk_rows: int  # parquet rows read per record batch
+
+
+class StudentOpts(TypedDict):
+    """options for the distilled student model"""
+
+    teacher: Literal["cnn", "lstm"]
+    architecture: Literal["tcn", "mlp"]
+    filters: int  # tcn channels
+    hidden_units: int  # mlp hidden layer
+    downsample: int  # mlp look-back average pooling
+    alpha: float  # weight of the teacher's forecast in the training targets
 
 
 class LoadForecastOptions(TypedDict):
@@ -52,7 +170,9 @@ class LoadForecastOptions(TypedDict):
     window_opts: WindowedDatasetOpts
     timezone_opts: TimeZoneOpts
     min_max_scale: bool
-    model: Literal["cnn", "lstm"]
+    model: Literal[
+        "cnn", "lstm", "student", "seasonal_naive", "seasonal_profile", "ridge"
+    ]
     loss: Literal["mae", "huber"]
     metrics: List[Literal["mae"]]
     epochs: int
@@ -70,6 +190,18 @@ class LoadForecastOptions(TypedDict):
             "hour",
         ]
     ]
+    repair_index: NotRequired[bool]
+    performance: NotRequired[PerformanceOpts]
+    cross_validation: NotRequired[CrossValidationOpts]
+    model_params: NotRequired[ModelParams]
+    search: NotRequired[SearchOpts]
+    fine_tune: NotRequired[FineTuneOpts]
+    distributed: NotRequired[DistributedOpts]
+    checkpoint: NotRequired[CheckpointOpts]
+    export: NotRequired[ExportOpts]
+    report: NotRequired[ReportOpts]
+    streaming: NotRequired[StreamingOpts]
+    student: NotRequired[StudentOpts]
 
 
 class DownloadValidation(TypedDict):
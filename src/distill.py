@@ -0,0 +1,43 @@
+""" this module distills the saved cnn/lstm teacher into the small student
+model and reports the accuracy cost and the single-forecast speedup """
+
+import json
+import os
+import sys
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from config import MODEL_OUT_PATH
+from model.distill import distill
+from model.model import has_saved_weights
+from model.performance import configure_runtime, get_performance_opts
+from preprocessing.pipeline import load_scaled_data
+from preprocessing.scaler import load_scaler, scaler_filepath
+
+if __name__ == "__main__":
+    configure_runtime(get_performance_opts(opts))
+
+    teacher = opts["student"]["teacher"]
+    if not has_saved_weights({**opts, "model": teacher}):  # type: ignore
+        raise sys.exit(
+            f"""no saved {teacher} weights for {opts['zone']},
+            train the teacher with app.py first."""
+        )
+
+    # the teacher was trained on data scaled with the saved scaler
+    saved_scaler = load_scaler(opts) if os.path.exists(scaler_filepath(opts)) else None
+    (scaled_model_data, _) = load_scaled_data(opts, saved_scaler)
+
+    summary = distill(scaled_model_data, opts)
+
+    print(
+        f"{summary['architecture']} student vs {teacher} teacher: "
+        f"{summary['speedup']:.1f}x faster per forecast "
+        f"({summary['student_latency_ms']:.2f} ms vs "
+        f"{summary['teacher_latency_ms']:.2f} ms), "
+        f"test loss x{summary['score_ratios']['loss']:.3f}"
+    )
+
+    os.makedirs(MODEL_OUT_PATH, exist_ok=True)
+    summary_path = os.path.join(MODEL_OUT_PATH, f"distill_{teacher}{opts['zone']}.json")
+    with open(summary_path, "w", encoding="utf-8") as summary_file:
+        json.dump(summary, summary_file, indent=4)
@@ -0,0 +1,47 @@
+""" this module exports every zone's multi-horizon forecast for every requested
+issue time to a Parquet dataset partitioned by zone and issue date """
+
+import os
+
+from config import FORECAST_EXPORT_PATH
+from config import FORECAST_OPTIONS_OBJECT as opts
+from custom_types import LoadForecastOptions
+from model.export import (
+    check_exportable,
+    forecast_record_batches,
+    forecast_schema,
+    make_predictor,
+    write_forecasts,
+)
+from model.performance import configure_runtime, get_performance_opts
+from preprocessing.pipeline import load_scaled_data
+from preprocessing.scaler import load_scaler, scaler_filepath
+
+if __name__ == "__main__":
+    check_exportable(opts)
+    configure_runtime(get_performance_opts(opts))
+
+    for zone in opts["export"]["zones"]:
+        zone_opts: LoadForecastOptions = {**opts, "zone": zone}  # type: ignore
+
+        # the saved scaler keeps exported MW consistent with the trained model
+        saved_scaler = (
+            load_scaler(zone_opts)
+            if os.path.exists(scaler_filepath(zone_opts))
+            else None
+        )
+        (scaled_model_data, scaler) = load_scaled_data(zone_opts, saved_scaler)
+        (predict, model_name) = make_predictor(scaled_model_data, zone_opts)
+
+        write_forecasts(
+            forecast_record_batches(
+                scaled_model_data,
+                predict,
+                model_name,
+                scaler,
+                zone_opts,
+            ),
+            forecast_schema(zone_opts["timezone_opts"]["timezone"]),
+            FORECAST_EXPORT_PATH,
+        )
+        print(f"{zone} forecasts written to {FORECAST_EXPORT_PATH}")
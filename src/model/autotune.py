@@ -0,0 +1,130 @@
+""" short timed training runs used by the CPU autotune command """
+
+import itertools
+import os
+from typing import List
+
+import numpy.typing as npt
+import tensorflow as tf  # type: ignore
+
+from custom_types import LoadForecastOptions, PerformanceOpts
+from model.callbacks import EpochTimer
+from model.model import build_model, compile_model
+from model.performance import configure_runtime
+from preprocessing.windowing import windowed_dataset_factory
+
+
+def cpu_supports_bfloat16() -> bool:
+    """check the CPU flags for native bfloat16 support (AVX512-BF16 or AMX)
+    Returns:
+      True if mixed bfloat16 is worth trying on this machine
+    """
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as cpuinfo:
+            flags = cpuinfo.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def candidate_profiles(base: PerformanceOpts) -> List[PerformanceOpts]:
+    """compute profiles tried by the first stage of the autotune command,
+    keeping the tf.data settings of `base`
+    Args:
+      base:     the configured performance options
+    Returns:
+      list of PerformanceOpts objects
+    """
+
+    cores = os.cpu_count() or 1
+    thread_pools = {(0, 0), (cores, 1), (max(cores // 2, 1), 2)}
+
+    return [
+        {
+            **base,
+            "jit_compile": jit_compile,
+            "steps_per_execution": steps_per_execution,
+            "intra_op_threads": intra_op_threads,
+            "inter_op_threads": inter_op_threads,
+            "mixed_bfloat16": mixed_bfloat16,
+            "onednn_opts": onednn_opts,
+        }
+        for jit_compile, steps_per_execution, (
+            intra_op_threads,
+            inter_op_threads,
+        ), mixed_bfloat16, onednn_opts in itertools.product(
+            (False, True),
+            (1, 16),
+            sorted(thread_pools),
+            (False, True) if cpu_supports_bfloat16() else (False,),
+            (True, False),
+        )
+    ]
+
+
+def input_pipeline_profiles(best: PerformanceOpts) -> List[PerformanceOpts]:
+    """tf.data profiles tried by the second stage of the autotune command, on
+    top of the fastest compute profile; tuned separately since they barely
+    interact with the compute settings, which keeps the number of trials small
+    Args:
+      best:     the fastest profile of the first stage
+    Returns:
+      list of PerformanceOpts objects
+    """
+
+    cores = os.cpu_count() or 1
+
+    return [
+        {
+            **best,
+            "deterministic": deterministic,
+            "private_threadpool_size": private_threadpool_size,
+        }
+        for deterministic, private_threadpool_size in itertools.product(
+            (True, False), sorted({0, max(cores // 2, 1), cores})
+        )
+    ]
+
+
+def time_profile(
+    perf: PerformanceOpts,
+    opts: LoadForecastOptions,
+    train_data: npt.NDArray,
+    steps: int,
+    epochs: int = 3,
+) -> float:
+    """train briefly with a performance profile and time the steady-state steps
+    meant to run in a fresh process, since thread pools and oneDNN are fixed
+    once TensorFlow has started
+    Args:
+      perf:     performance profile to try
+      opts:     LoadForecastOptions object for this run
+      train_data:   scaled training rows
+      steps:    number of batches per epoch
+      epochs:   number of short epochs; the first one (tracing/compiling) is ignored
+    Returns:
+      seconds per training step
+    """
+
+    configure_runtime(perf)
+    trial_opts: LoadForecastOptions = {**opts, "performance": perf}  # type: ignore
+
+    windowing = windowed_dataset_factory(
+        trial_opts["window_opts"],
+        features=(1 + len(trial_opts["additional_features"])),
+        performance=perf,
+    )
+    # not cached, so every epoch runs the input pipeline being timed
+    dataset = (
+        windowing.make_windows(tf.data.Dataset.from_tensor_slices(train_data))
+        .take(steps)
+        .repeat()
+    )
+
+    model = compile_model(build_model(trial_opts), trial_opts)
+    timer = EpochTimer()
+    model.fit(
+        dataset, epochs=epochs, steps_per_epoch=steps, verbose=0, callbacks=[timer]
+    )
+
+    return min(timer.epoch_times[1:]) / steps
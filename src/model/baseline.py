@@ -0,0 +1,239 @@
+""" vectorized NumPy baseline forecasters
+each one forecasts every window at once from the same (look-back, horizon)
+layout as `windowed_dataset_factory`, for comparison with and as a fallback
+for the NN models """
+
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from custom_types import LoadForecastOptions, WindowedDatasetOpts
+from model.evaluation import evaluate_predictions
+from preprocessing.windowing import make_window_arrays
+
+BASELINE_MODELS = ("seasonal_naive", "seasonal_profile", "ridge")
+
+SEASON_LEN = 24 * 7  # hourly data with a weekly cycle
+
+RIDGE_ALPHA = 1.0
+
+
+def load_lags(windows: npt.NDArray) -> npt.NDArray:
+    """the load column of a batch of look-back windows
+    Args:
+        windows:    shape (windows, window) or (windows, window, features)
+    Returns:
+        array of shape (windows, window)
+    """
+    return windows if windows.ndim == 2 else windows[..., 0]
+
+
+def validate_season(opts: WindowedDatasetOpts) -> None:
+    """check that the look-back window holds at least one full season
+    Args:
+        opts:   windowing options object
+    Raises:
+        SystemExit if the window is shorter than a season
+    """
+    if opts["window"] < SEASON_LEN:
+        raise sys.exit(
+            f"""
+            Invalid options.
+            Seasonal baselines need a window of at least {SEASON_LEN} intervals.
+            Exiting now.
+            """
+        )
+
+
+@dataclass
+class SeasonalNaive:
+    """repeats the last season of the look-back window over the horizon
+    Attributes:
+        opts:       windowing options object
+        lag_idx:    look-back index used for each horizon step
+    """
+
+    opts: WindowedDatasetOpts
+
+    def __post_init__(self):
+        validate_season(self.opts)
+
+        self.lag_idx = (
+            self.opts["window"]
+            - SEASON_LEN
+            + np.arange(self.opts["horizon"]) % SEASON_LEN
+        )
+
+    def fit(self, _windows: npt.NDArray, _horizons: npt.NDArray) -> SeasonalNaive:
+        """nothing to fit"""
+        return self
+
+    def predict(self, windows: npt.NDArray) -> npt.NDArray:
+        """forecast every window at once
+        Args:
+            windows:    look-back windows
+        Returns:
+            forecasts of shape (windows, horizon)
+        """
+        return load_lags(windows)[:, self.lag_idx]
+
+
+@dataclass
+class SeasonalProfile:
+    """averages every full season in the look-back window
+    Attributes:
+        opts:       windowing options object
+        lag_idx:    look-back indices averaged for each horizon step,
+                    shape (seasons, horizon)
+    """
+
+    opts: WindowedDatasetOpts
+
+    def __post_init__(self):
+        validate_season(self.opts)
+
+        seasons = np.arange(1, self.opts["window"] // SEASON_LEN + 1)
+        self.lag_idx = (
+            self.opts["window"]
+            - SEASON_LEN * seasons[:, None]
+            + (np.arange(self.opts["horizon"]) % SEASON_LEN)[None, :]
+        )
+
+    def fit(self, _windows: npt.NDArray, _horizons: npt.NDArray) -> SeasonalProfile:
+        """nothing to fit"""
+        return self
+
+    def predict(self, windows: npt.NDArray) -> npt.NDArray:
+        """forecast every window at once
+        Args:
+            windows:    look-back windows
+        Returns:
+            forecasts of shape (windows, horizon)
+        """
+        return load_lags(windows)[:, self.lag_idx].mean(axis=1)
+
+
+@dataclass
+class RidgeForecaster:
+    """closed-form ridge regression of the horizon on the look-back loads and
+    the calendar features of the last look-back interval
+    Attributes:
+        opts:       windowing options object
+        alpha:      L2 penalty (the intercept is not penalized)
+        coef:       fitted coefficients, shape (inputs + 1, horizon)
+    """
+
+    opts: WindowedDatasetOpts
+    alpha: float = RIDGE_ALPHA
+
+    def __post_init__(self):
+        self.coef = np.zeros(0)
+
+    @staticmethod
+    def design_matrix(windows: npt.NDArray) -> npt.NDArray:
+        """lag, calendar and intercept columns for each window
+        Args:
+            windows:    look-back windows
+        Returns:
+            float64 array of shape (windows, inputs + 1)
+        """
+
+        columns = [load_lags(windows)]
+        if windows.ndim == 3:
+            columns.append(windows[:, -1, 1:])
+        columns.append(np.ones((len(windows), 1)))
+
+        return np.hstack(columns).astype(np.float64)
+
+    def fit(self, windows: npt.NDArray, horizons: npt.NDArray) -> RidgeForecaster:
+        """solve the normal equations for all horizon steps at once
+        Args:
+            windows:    look-back windows
+            horizons:   actual horizons
+        Returns:
+            the fitted forecaster
+        """
+
+        design = self.design_matrix(windows)
+        penalty = self.alpha * np.eye(design.shape[1])
+        penalty[-1, -1] = 0.0
+
+        self.coef = np.linalg.solve(
+            design.T @ design + penalty, design.T @ horizons.astype(np.float64)
+        )
+
+        return self
+
+    def predict(self, windows: npt.NDArray) -> npt.NDArray:
+        """forecast every window at once
+        Args:
+            windows:    look-back windows
+        Returns:
+            forecasts of shape (windows, horizon)
+        """
+        return self.design_matrix(windows) @ self.coef
+
+
+def baseline_model_factory(
+    opts: LoadForecastOptions,
+) -> Union[SeasonalNaive, SeasonalProfile, RidgeForecaster]:
+    """used for creating baseline forecasters
+    Args:
+        opts:   LoadForecastOptions object for this run
+    Returns:
+        unfitted baseline forecaster selected by `opts["model"]`
+    Raises:
+        SystemExit if the model is not a baseline
+    """
+
+    if opts["model"] == "seasonal_naive":
+        return SeasonalNaive(opts["window_opts"])
+    if opts["model"] == "seasonal_profile":
+        return SeasonalProfile(opts["window_opts"])
+    if opts["model"] == "ridge":
+        return RidgeForecaster(opts["window_opts"])
+    raise sys.exit(
+        f"""
+        Invalid options.
+        {opts["model"]} is not one of the baseline models {BASELINE_MODELS}.
+        Exiting now.
+        """
+    )
+
+
+def run_baseline(
+    opts: LoadForecastOptions,
+    train_data: Union[pd.Series, pd.DataFrame, npt.NDArray],
+    test_data: Union[pd.Series, pd.DataFrame, npt.NDArray],
+) -> Tuple[Union[SeasonalNaive, SeasonalProfile, RidgeForecaster], Dict[str, float]]:
+    """fit a baseline on every training window and score it on the test windows
+    Args:
+        opts:   LoadForecastOptions object for this run
+        train_data:     scaled training split, one row per interval
+        test_data:      scaled test split, one row per interval
+    Returns:
+        the fitted baseline and its test loss and metrics
+    """
+
+    (train_windows, train_horizons) = make_window_arrays(
+        np.asarray(train_data, dtype=np.float32), opts["window_opts"]
+    )
+    (test_windows, test_horizons) = make_window_arrays(
+        np.asarray(test_data, dtype=np.float32), opts["window_opts"]
+    )
+
+    start = time.perf_counter()
+    baseline = baseline_model_factory(opts).fit(train_windows, train_horizons)
+    fit_seconds = time.perf_counter() - start
+
+    scores = evaluate_predictions(test_horizons, baseline.predict(test_windows), opts)
+    print(f"{opts['model']} fitted in {fit_seconds:.3f} s, test scores: {scores}")
+
+    return (baseline, scores)
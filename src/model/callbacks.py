@@ -1,17 +1,26 @@
 """ modeling callbacks """
 
+import glob
 import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+import numpy.typing as npt
 import tensorflow as tf  # type: ignore
 
 
 def best_val_loss_checkpoint(
-    model_name: str, path: str = "out"
+    model_name: str,
+    path: str = "out",
+    initial_value_threshold: Optional[float] = None,
 ) -> tf.keras.callbacks.ModelCheckpoint:
     """callback for best val loss
     Args:
       model_name: string model name
       path: string save path
+      initial_value_threshold: val loss a new checkpoint must beat, if any
     Returns
       ModelCheckPoint callback
     """
@@ -23,9 +32,229 @@ def best_val_loss_checkpoint(
         verbose=0,
         monitor="val_loss",
         save_best_only=True,
+        initial_value_threshold=initial_value_threshold,
     )
 
 
+# the timing counters and the step bookkeeping for resumable step checkpoints
+# are per-run state of one callback, like keras' own ModelCheckpoint
+class AsyncWeightsCheckpoint(  # pylint: disable=too-many-instance-attributes
+    tf.keras.callbacks.Callback
+):
+    """weights-only checkpoints written on a background thread
+    the training loop only waits for the weights to be copied to host memory
+    (and for the previous write, if it is still running); files are written
+    to a temporary name, renamed atomically, and rotated to keep the last N.
+    step checkpoints also hold the optimizer state, the epoch in progress and
+    the best monitored value, so an interrupted run can resume from them with
+    `resume_step_checkpoint`; they are deleted when training finishes
+    Attributes:
+      filepath:     checkpoint path without suffix
+      monitor:      metric that decides the best checkpoint
+      keep_last:    number of best and of step checkpoints kept on disk
+      save_freq_steps:  also checkpoint every N training steps, if set
+      best:         best monitored value so far
+      blocked_seconds:  time the training loop spent blocked on checkpoints
+      write_seconds:    time spent writing files on the background thread
+      saves:        number of checkpoints written
+    """
+
+    # keyword options mirror keras' ModelCheckpoint
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        model_name: str,
+        *,
+        path: str = "out",
+        monitor: str = "val_loss",
+        keep_last: int = 3,
+        save_freq_steps: Optional[int] = None,
+        initial_value_threshold: Optional[float] = None,
+    ):
+        super().__init__()
+        self.filepath = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "..", "..", path, model_name
+        )
+        self.monitor = monitor
+        self.keep_last = keep_last
+        self.save_freq_steps = save_freq_steps
+        self.best = (
+            np.inf if initial_value_threshold is None else initial_value_threshold
+        )
+        self.blocked_seconds = 0.0
+        self.write_seconds = 0.0
+        self.saves = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+        self._global_step = 0
+        self._epoch = 0
+        self._epoch_start_step = 0
+        self._last_step_save = 0
+
+    # pylint: disable=unused-argument
+    def on_epoch_begin(self, epoch, logs=None):
+        """remember the epoch and the step count it starts at"""
+        self._epoch = epoch
+        self._epoch_start_step = self._global_step
+
+    def on_train_batch_end(self, batch, logs=None):
+        """queue a step checkpoint every `save_freq_steps` steps"""
+        # with steps_per_execution > 1 this is only called every few steps
+        self._global_step = self._epoch_start_step + batch + 1
+        if (
+            self.save_freq_steps is not None
+            and self._global_step - self._last_step_save >= self.save_freq_steps
+        ):
+            self._last_step_save = self._global_step
+            self._snapshot("step", f"step{self._global_step}")
+
+    def on_epoch_end(self, epoch, logs=None):
+        """queue a best checkpoint if the monitored value improved"""
+        current = (logs or {}).get(self.monitor)
+        if current is not None and current < self.best:
+            self.best = current
+            self._snapshot("best", f"epoch{epoch + 1}")
+
+    def on_train_end(self, logs=None):
+        """wait for the last write, drop the step checkpoints, report timings
+        a failed last write is raised here, and the step checkpoints are kept
+        """
+        start = time.perf_counter()
+        try:
+            if self._pending is not None:
+                self._pending.result()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.blocked_seconds += time.perf_counter() - start
+        # training finished, nothing left to resume
+        for step_path in glob.glob(f"{self.filepath}.step-*.npz"):
+            os.remove(step_path)
+        print(
+            f"checkpointing: {self.saves} saves, training blocked for "
+            f"{self.blocked_seconds:.2f} s, background writes took "
+            f"{self.write_seconds:.2f} s"
+        )
+
+    def _snapshot(self, kind: str, label: str) -> None:
+        """copy the weights to host memory and queue the write
+        Args:
+          kind:     "best" or "step", rotated separately
+          label:    epoch or step counter, for the file name
+        """
+
+        start = time.perf_counter()
+        if self._pending is not None:
+            self._pending.result()
+        weights = self.model.get_weights()
+        resume_state: Dict[str, npt.NDArray] = {}
+        if kind == "step":
+            resume_state = {
+                "epoch": np.array(self._epoch),
+                "best": np.array(self.best),
+                **{
+                    f"optimizer_{i}": optimizer_weights
+                    for i, optimizer_weights in enumerate(
+                        self.model.optimizer.get_weights()
+                    )
+                },
+            }
+        # nanosecond timestamps keep the names in save order across runs
+        tag = f"{kind}-{time.time_ns()}-{label}"
+        self._pending = self._executor.submit(self._write, weights, resume_state, tag)
+        self.blocked_seconds += time.perf_counter() - start
+
+    def _write(
+        self,
+        weights: List[npt.NDArray],
+        resume_state: Dict[str, npt.NDArray],
+        tag: str,
+    ) -> None:
+        """write one checkpoint and rotate old ones, on the background thread
+        Args:
+          weights:  host copies of the model weights
+          resume_state:     optimizer weights, epoch and best value (step only)
+          tag:  checkpoint kind, timestamp and counter, used in the file name
+        """
+
+        start = time.perf_counter()
+        final_path = f"{self.filepath}.{tag}.npz"
+        with open(f"{final_path}.tmp", "wb") as checkpoint_file:
+            np.savez(checkpoint_file, *weights, **resume_state)
+        os.replace(f"{final_path}.tmp", final_path)
+
+        kind = tag.split("-", maxsplit=1)[0]
+        for old_path in sorted(glob.glob(f"{self.filepath}.{kind}-*.npz"))[
+            : -self.keep_last
+        ]:
+            os.remove(old_path)
+
+        self.saves += 1
+        self.write_seconds += time.perf_counter() - start
+
+
+def latest_weights_checkpoint(
+    model_name: str, path: str = "out", kind: str = "best"
+) -> Optional[str]:
+    """the newest checkpoint written by AsyncWeightsCheckpoint
+    Args:
+      model_name: string model name
+      path: string save path
+      kind: "best" for the best monitored value, "step" for the periodic ones
+    Returns:
+      filepath in string format, or None if there is no checkpoint
+    """
+
+    checkpoints = sorted(
+        glob.glob(
+            os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                "..",
+                "..",
+                path,
+                f"{model_name}.{kind}-*.npz",
+            )
+        )
+    )
+    return checkpoints[-1] if checkpoints else None
+
+
+def load_weights_checkpoint(model: tf.keras.Model, filepath: str) -> None:
+    """load a checkpoint written by AsyncWeightsCheckpoint into a built model
+    Args:
+      model:    model with the same architecture as the checkpointed one
+      filepath: checkpoint path
+    """
+
+    with np.load(filepath) as checkpoint:
+        n_weights = sum(name.startswith("arr_") for name in checkpoint.files)
+        model.set_weights([checkpoint[f"arr_{i}"] for i in range(n_weights)])
+
+
+def resume_step_checkpoint(model: tf.keras.Model, filepath: str) -> Tuple[int, float]:
+    """load the weights and optimizer state of a step checkpoint into a compiled
+    model, to continue an interrupted run from the start of its last epoch
+    Args:
+      model:    compiled model with the same architecture and optimizer
+      filepath: step checkpoint path
+    Returns:
+      (epoch to pass to `fit` as `initial_epoch`, best monitored value so far)
+    """
+
+    load_weights_checkpoint(model, filepath)
+
+    # the optimizer creates its slots lazily: a zero-gradient step creates them
+    # without moving the weights, then the saved values replace them
+    variables = model.trainable_variables
+    model.optimizer.apply_gradients(
+        zip([tf.zeros_like(variable) for variable in variables], variables)
+    )
+    with np.load(filepath) as checkpoint:
+        n_optimizer = sum(name.startswith("optimizer_") for name in checkpoint.files)
+        model.optimizer.set_weights(
+            [checkpoint[f"optimizer_{i}"] for i in range(n_optimizer)]
+        )
+        return (int(checkpoint["epoch"]), float(checkpoint["best"]))
+
+
 def early_stopping(patience: int) -> tf.keras.callbacks.EarlyStopping:
     """callback for early stopping
     Returns
@@ -48,3 +277,24 @@ def reduce_lr_on_plateau(patience: int) -> tf.keras.callbacks.ReduceLROnPlateau:
         patience=patience,
         verbose=1,
     )
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """records the wall time of each training epoch
+    Attributes:
+      epoch_times:  list of epoch durations (seconds)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.epoch_times: List[float] = []
+        self._epoch_start = 0.0
+
+    # pylint: disable=unused-argument
+    def on_epoch_begin(self, epoch, logs=None):
+        """start the epoch clock"""
+        self._epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        """record the epoch duration"""
+        self.epoch_times.append(time.perf_counter() - self._epoch_start)
@@ -0,0 +1,127 @@
+""" rolling/expanding-origin cross-validation, one worker process per fold """
+
+import os
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf  # type: ignore
+
+from config import MODEL_OUT_PATH
+from custom_types import LoadForecastOptions
+from model.baseline import BASELINE_MODELS, run_baseline
+from model.callbacks import early_stopping, reduce_lr_on_plateau
+from model.model import build_model, compile_model
+from model.performance import worker_pool
+from preprocessing.pipeline import (
+    make_windowed_datasets,
+    open_feature_matrix,
+    write_feature_matrix,
+)
+from preprocessing.train_test_splits import rolling_origin_splits, validation_split
+
+
+def train_fold(
+    fold: int,
+    train_rows: slice,
+    test_rows: slice,
+    features_path: str,
+    opts: LoadForecastOptions,
+) -> Dict[str, float]:
+    """train and evaluate one cross-validation fold
+    Args:
+      fold:     fold index
+      train_rows:   row slice of the training data
+      test_rows:    row slice of the test data
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      dict of the fold's test loss and metrics
+    """
+
+    features = open_feature_matrix(features_path)
+
+    if opts["model"] in BASELINE_MODELS:
+        (_, scores) = run_baseline(opts, features[train_rows], features[test_rows])
+        return {"fold": fold, **scores}
+
+    # early stopping selects weights on the tail of the training rows only
+    (fit_rows, validation_rows) = validation_split(train_rows, opts)
+    (fit_dataset, validation_dataset) = make_windowed_datasets(
+        np.array(features[fit_rows]), np.array(features[validation_rows]), opts
+    )
+    (_, test_dataset) = make_windowed_datasets(
+        np.array(features[validation_rows]), np.array(features[test_rows]), opts
+    )
+
+    tf.keras.backend.clear_session()
+    model = compile_model(build_model(opts), opts)
+    model.fit(
+        fit_dataset,
+        epochs=opts["epochs"],
+        validation_data=validation_dataset,
+        verbose=0,
+        callbacks=[
+            early_stopping(opts["es_patience"]),
+            reduce_lr_on_plateau(opts["lr_patience"]),
+        ],
+    )
+
+    return {"fold": fold, **model.evaluate(test_dataset, verbose=0, return_dict=True)}
+
+
+def aggregate_fold_metrics(
+    fold_metrics: List[Dict[str, float]]
+) -> Dict[str, Dict[str, float]]:
+    """mean and standard deviation of each metric across folds
+    Args:
+      fold_metrics:     list of per-fold metric dicts
+    Returns:
+      dict of {metric: {"mean": ..., "std": ...}}
+    """
+
+    metric_names = [name for name in fold_metrics[0] if name != "fold"]
+    return {
+        name: {
+            "mean": float(np.mean([metrics[name] for metrics in fold_metrics])),
+            "std": float(np.std([metrics[name] for metrics in fold_metrics])),
+        }
+        for name in metric_names
+    }
+
+
+def cross_validate(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Dict[str, Union[List[Dict[str, float]], Dict[str, Dict[str, float]]]]:
+    """train the rolling-origin folds in parallel worker processes
+    the scaled data is written once to a memory-mapped .npy file that every
+    worker slices, and the TF thread pools are split between the workers
+    Args:
+      data:     scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      dict with per-fold metrics and their aggregate
+    """
+
+    splits = rolling_origin_splits(len(data), opts)
+    workers = min(opts["cross_validation"]["workers"], len(splits))
+    threads = opts["cross_validation"].get(
+        "threads_per_worker", max((os.cpu_count() or 1) // workers, 1)
+    )
+
+    features_path = os.path.join(MODEL_OUT_PATH, f"features{opts['zone']}.npy")
+    write_feature_matrix(data, features_path)
+
+    with worker_pool(opts, workers, threads) as executor:
+        fold_metrics = list(
+            executor.map(
+                train_fold,
+                range(len(splits)),
+                [train_rows for (train_rows, _) in splits],
+                [test_rows for (_, test_rows) in splits],
+                [features_path] * len(splits),
+                [opts] * len(splits),
+            )
+        )
+
+    return {"folds": fold_metrics, "aggregate": aggregate_fold_metrics(fold_metrics)}
@@ -0,0 +1,199 @@
+""" distillation of the cnn/lstm teacher into a small, low-latency student """
+
+import time
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import tensorflow as tf  # type: ignore
+
+from custom_types import LoadForecastOptions
+from model.callbacks import early_stopping, reduce_lr_on_plateau
+from model.evaluation import evaluate_predictions
+from model.model import (
+    build_model,
+    checkpoint_callback,
+    compile_model,
+    load_saved_weights,
+)
+from preprocessing.train_test_splits import train_test_rows, validation_split
+from preprocessing.windowing import dataset_options, make_window_arrays
+
+PREDICT_BATCH_SIZE = 1024
+
+LATENCY_REPEATS = 200
+
+
+def batched_predict(model: tf.keras.Model, windows: npt.NDArray) -> npt.NDArray:
+    """predict every window, `PREDICT_BATCH_SIZE` at a time
+    Args:
+      model:    trained model
+      windows:  look-back windows
+    Returns:
+      forecasts of shape (windows, horizon)
+    """
+    return np.concatenate(
+        [
+            model.predict_on_batch(
+                np.array(windows[start : start + PREDICT_BATCH_SIZE])
+            )
+            for start in range(0, len(windows), PREDICT_BATCH_SIZE)
+        ]
+    )
+
+
+def single_forecast_latency(model: tf.keras.Model, window: npt.NDArray) -> float:
+    """median CPU latency of one forecast through a traced serving function
+    Args:
+      model:    trained model
+      window:   one look-back window
+    Returns:
+      milliseconds per forecast
+    """
+
+    serve = tf.function(lambda inputs: model(inputs, training=False))
+    inputs = tf.constant(window[None, ...])
+    serve(inputs)  # trace
+
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        serve(inputs).numpy()
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings) * 1000)
+
+
+def split_windows(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Dict[str, Tuple[npt.NDArray, npt.NDArray]]:
+    """look-back windows and horizons of the fitting, validation and test rows
+    the validation rows are the last `1 - train_pct` share of the training
+    rows, so the test windows only score the final comparison
+    Args:
+      data:     scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      dict of (windows, horizons) for "fit", "validation" and "test"
+    """
+
+    rows = np.asarray(data, dtype=np.float32)
+    (train_rows, test_rows) = train_test_rows(len(rows), opts)
+    (fit_rows, validation_rows) = validation_split(train_rows, opts)
+
+    return {
+        split: make_window_arrays(rows[split_rows], opts["window_opts"])
+        for split, split_rows in (
+            ("fit", fit_rows),
+            ("validation", validation_rows),
+            ("test", test_rows),
+        )
+    }
+
+
+def fit_student(
+    teacher: tf.keras.Model,
+    windows: Dict[str, Tuple[npt.NDArray, npt.NDArray]],
+    opts: LoadForecastOptions,
+) -> tf.keras.Model:
+    """train the student on the teacher's forecasts over the fitting windows,
+    checkpointing, stopping early and lowering the learning rate on the
+    validation windows
+    Args:
+      teacher:  the trained teacher model
+      windows:  (windows, horizons) of each split, from `split_windows`
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      the student with its best checkpointed weights
+    """
+
+    student_opts: LoadForecastOptions = {**opts, "model": "student"}  # type: ignore
+    (fit_windows, fit_horizons) = windows["fit"]
+    (validation_windows, validation_horizons) = windows["validation"]
+
+    # soft targets, optionally blended with the actuals
+    alpha = opts["student"]["alpha"]
+    targets = alpha * batched_predict(teacher, fit_windows) + (1 - alpha) * np.asarray(
+        fit_horizons
+    )
+
+    batch_size = opts["window_opts"]["batch_size"]
+    fit_dataset = (
+        tf.data.Dataset.from_tensor_slices((np.array(fit_windows), targets))
+        .shuffle(opts["window_opts"].get("shuffle_buffer_size", len(targets)))
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+        .with_options(dataset_options(opts.get("performance")))
+    )
+    validation_dataset = (
+        tf.data.Dataset.from_tensor_slices(
+            (np.array(validation_windows), np.array(validation_horizons))
+        )
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+    student = compile_model(build_model(student_opts), student_opts)
+    student.fit(
+        fit_dataset,
+        epochs=opts["epochs"],
+        validation_data=validation_dataset,
+        verbose=1,
+        callbacks=[
+            checkpoint_callback(student_opts),
+            early_stopping(opts["es_patience"]),
+            reduce_lr_on_plateau(opts["lr_patience"]),
+        ],
+    )
+    load_saved_weights(student, student_opts)
+
+    return student
+
+
+def distill(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Dict[str, Any]:
+    """train the student on the teacher's forecasts over the training windows
+    and compare their test scores and single-forecast latency
+    Args:
+      data:     scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      dict of teacher/student test scores, latencies and their ratios
+    """
+
+    teacher_opts: LoadForecastOptions = {  # type: ignore
+        **opts,
+        "model": opts["student"]["teacher"],
+    }
+    windows = split_windows(data, opts)
+
+    tf.keras.backend.clear_session()
+    teacher = build_model(teacher_opts)
+    load_saved_weights(teacher, teacher_opts)
+    student = fit_student(teacher, windows, opts)
+
+    (test_windows, test_horizons) = windows["test"]
+    teacher_scores = evaluate_predictions(
+        test_horizons, batched_predict(teacher, test_windows), opts
+    )
+    student_scores = evaluate_predictions(
+        test_horizons, batched_predict(student, test_windows), opts
+    )
+    teacher_ms = single_forecast_latency(teacher, np.array(test_windows[0]))
+    student_ms = single_forecast_latency(student, np.array(test_windows[0]))
+
+    return {
+        "teacher": opts["student"]["teacher"],
+        "architecture": opts["student"]["architecture"],
+        "teacher_scores": teacher_scores,
+        "student_scores": student_scores,
+        "teacher_latency_ms": teacher_ms,
+        "student_latency_ms": student_ms,
+        "speedup": teacher_ms / student_ms,
+        "score_ratios": {
+            name: student_scores[name] / teacher_score
+            for name, teacher_score in teacher_scores.items()
+        },
+    }
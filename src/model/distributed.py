@@ -0,0 +1,256 @@
+""" data-parallel training on the local machine with tf.distribute
+either MultiWorkerMirroredStrategy across localhost worker processes or
+MirroredStrategy across logical CPU devices of a single process """
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf  # type: ignore
+
+from custom_types import LoadForecastOptions
+from model.callbacks import EpochTimer, early_stopping, reduce_lr_on_plateau
+from model.model import (
+    build_model,
+    check_trainable,
+    checkpoint_callback,
+    compile_model,
+)
+from model.performance import (
+    configure_runtime,
+    configure_worker_runtime,
+    get_performance_opts,
+)
+from preprocessing.pipeline import make_windowed_datasets, open_feature_matrix
+from preprocessing.train_test_splits import train_test_rows
+
+BASE_LEARNING_RATE = 0.001  # Adam default, for a single worker
+
+
+def scaled_options(opts: LoadForecastOptions, workers: int) -> LoadForecastOptions:
+    """forecast options with the global batch size scaled by the worker count
+    every worker builds the same pipeline and keeps every `workers`-th batch
+    (AutoShardPolicy.DATA), so the shuffle is seeded and the pipeline kept
+    deterministic for the workers' batches to line up into disjoint shards
+    Args:
+      opts:     LoadForecastOptions object for this run
+      workers:  number of data-parallel replicas
+    Returns:
+      LoadForecastOptions object with the global batch size
+    """
+    return {  # type: ignore
+        **opts,
+        "window_opts": {
+            **opts["window_opts"],
+            "batch_size": opts["window_opts"]["batch_size"] * workers,
+            "shuffle_seed": opts["distributed"]["seed"],
+        },
+        "performance": {**get_performance_opts(opts), "deterministic": True},
+    }
+
+
+def multi_worker_tf_config(workers: int, index: int, base_port: int) -> str:
+    """TF_CONFIG cluster spec for worker processes on localhost
+    Args:
+      workers:  number of worker processes
+      index:    this worker's index (0 is the chief)
+      base_port:    port of worker 0, the others use the following ports
+    Returns:
+      TF_CONFIG json string
+    """
+    return json.dumps(
+        {
+            "cluster": {
+                "worker": [f"localhost:{base_port + i}" for i in range(workers)]
+            },
+            "task": {"type": "worker", "index": index},
+        }
+    )
+
+
+def sharded_datasets(
+    features_path: str, run_opts: LoadForecastOptions
+) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+    """windowed train/test datasets, each worker keeping its own shard of batches
+    Args:
+      features_path:    path to the memory-mapped feature matrix
+      run_opts:     LoadForecastOptions object from `scaled_options`
+    Returns:
+      windowed training and test datasets, sharded by AutoShardPolicy.DATA
+    """
+
+    features = open_feature_matrix(features_path)
+    (train_rows, test_rows) = train_test_rows(len(features), run_opts)
+    (train_dataset, test_dataset) = make_windowed_datasets(
+        np.array(features[train_rows]), np.array(features[test_rows]), run_opts
+    )
+
+    shard_options = tf.data.Options()
+    shard_options.experimental_distribute.auto_shard_policy = (
+        tf.data.experimental.AutoShardPolicy.DATA
+    )
+
+    return (
+        train_dataset.with_options(shard_options),
+        test_dataset.with_options(shard_options),
+    )
+
+
+def fit_distributed(
+    strategy: tf.distribute.Strategy,
+    features_path: str,
+    opts: LoadForecastOptions,
+    is_chief: bool,
+    steps_per_epoch: Optional[int] = None,
+) -> Dict[str, float]:
+    """train a model replicated by `strategy`, each worker reading its own shard
+    Args:
+      strategy:     the tf.distribute strategy, one replica per worker
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+      is_chief:     whether this process checkpoints the best weights
+      steps_per_epoch:  limit on global steps per epoch (benchmarks), None for all;
+        benchmark epochs skip validation so only training steps are timed
+    Returns:
+      dict of the final val loss and steady-state seconds per epoch
+    """
+
+    check_trainable(opts)
+    workers = strategy.num_replicas_in_sync
+    run_opts = scaled_options(opts, workers)
+    (train_dataset, test_dataset) = sharded_datasets(features_path, run_opts)
+    if steps_per_epoch is not None:
+        train_dataset = train_dataset.repeat()
+
+    with strategy.scope():
+        model = compile_model(
+            build_model(run_opts), run_opts, BASE_LEARNING_RATE * workers
+        )
+
+    # benchmark epochs are timed on training steps only, and validated once
+    benchmark = steps_per_epoch is not None
+    timer = EpochTimer()
+    callbacks = [timer]
+    if not benchmark:
+        callbacks += [
+            early_stopping(opts["es_patience"]),
+            reduce_lr_on_plateau(opts["lr_patience"]),
+        ]
+        if is_chief:
+            callbacks.append(checkpoint_callback(opts))
+
+    history = model.fit(
+        train_dataset,
+        epochs=opts["epochs"],
+        steps_per_epoch=steps_per_epoch,
+        validation_data=None if benchmark else test_dataset,
+        verbose=1 if is_chief else 0,
+        callbacks=callbacks,
+    )
+    val_loss = (
+        model.evaluate(test_dataset, verbose=0, return_dict=True)["loss"]
+        if benchmark
+        else history.history["val_loss"][-1]
+    )
+
+    return {
+        "val_loss": float(val_loss),
+        "seconds_per_epoch": min(timer.epoch_times[1:] or timer.epoch_times),
+    }
+
+
+def multi_worker_process(
+    index: int,
+    workers: int,
+    features_path: str,
+    opts: LoadForecastOptions,
+    steps_per_epoch: Optional[int] = None,
+) -> Dict[str, float]:
+    """one localhost worker of a MultiWorkerMirroredStrategy run
+    Args:
+      index:    this worker's index (0 is the chief)
+      workers:  number of worker processes
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+      steps_per_epoch:  limit on global steps per epoch (benchmarks), None for all
+    Returns:
+      dict of the final val loss and steady-state seconds per epoch
+    """
+
+    configure_worker_runtime(opts, max((os.cpu_count() or 1) // workers, 1))
+    os.environ["TF_CONFIG"] = multi_worker_tf_config(
+        workers, index, opts["distributed"]["base_port"]
+    )
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+
+    return fit_distributed(strategy, features_path, opts, index == 0, steps_per_epoch)
+
+
+def mirrored_process(
+    workers: int,
+    features_path: str,
+    opts: LoadForecastOptions,
+    steps_per_epoch: Optional[int] = None,
+) -> Dict[str, float]:
+    """a MirroredStrategy run over `workers` logical CPU devices in one process
+    Args:
+      workers:  number of logical CPU devices (replicas)
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+      steps_per_epoch:  limit on global steps per epoch (benchmarks), None for all
+    Returns:
+      dict of the final val loss and steady-state seconds per epoch
+    """
+
+    configure_runtime(get_performance_opts(opts))
+    tf.config.set_logical_device_configuration(
+        tf.config.list_physical_devices("CPU")[0],
+        [tf.config.LogicalDeviceConfiguration() for _ in range(workers)],
+    )
+    strategy = tf.distribute.MirroredStrategy(
+        [device.name for device in tf.config.list_logical_devices("CPU")]
+    )
+
+    return fit_distributed(strategy, features_path, opts, True, steps_per_epoch)
+
+
+def train_distributed(
+    features_path: str,
+    opts: LoadForecastOptions,
+    steps_per_epoch: Optional[int] = None,
+) -> Dict[str, float]:
+    """run data-parallel training in fresh processes, since the cluster spec,
+    logical devices and thread pools are fixed once TensorFlow has started
+    Args:
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+      steps_per_epoch:  limit on global steps per epoch (benchmarks), None for all
+    Returns:
+      the chief's dict of the final val loss and steady-state seconds per epoch
+    """
+
+    workers = opts["distributed"]["workers"]
+    spawn_context = multiprocessing.get_context("spawn")
+
+    if opts["distributed"]["strategy"] == "mirrored":
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn_context) as executor:
+            return executor.submit(
+                mirrored_process, workers, features_path, opts, steps_per_epoch
+            ).result()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=spawn_context) as executor:
+        futures = [
+            executor.submit(
+                multi_worker_process,
+                index,
+                workers,
+                features_path,
+                opts,
+                steps_per_epoch,
+            )
+            for index in range(workers)
+        ]
+        return [future.result() for future in futures][0]
@@ -0,0 +1,35 @@
+""" scoring of forecasts with the loss and metrics from the options """
+
+from typing import Dict
+
+import numpy as np
+import numpy.typing as npt
+import tensorflow as tf  # type: ignore
+
+from custom_types import LoadForecastOptions
+
+
+def evaluate_predictions(
+    y_true: npt.NDArray, y_pred: npt.NDArray, opts: LoadForecastOptions
+) -> Dict[str, float]:
+    """score forecasts the way `model.evaluate` does for the NN models
+    Args:
+      y_true:   actual horizons, shape (windows, horizon)
+      y_pred:   forecast horizons, shape (windows, horizon)
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      dict of the mean loss and metrics, keyed like `model.evaluate(return_dict=True)`
+    """
+
+    y_true = np.asarray(y_true, dtype=np.float32)
+    y_pred = np.asarray(y_pred, dtype=np.float32)
+
+    scores = {
+        "loss": float(tf.reduce_mean(tf.keras.losses.get(opts["loss"])(y_true, y_pred)))
+    }
+    for metric in opts["metrics"]:
+        scores[metric] = float(
+            tf.reduce_mean(tf.keras.metrics.get(metric)(y_true, y_pred))
+        )
+
+    return scores
@@ -0,0 +1,261 @@
+""" bulk multi-horizon forecast export to a partitioned Parquet dataset
+forecasts are predicted and converted to Arrow record batches one batch of
+issue times at a time, and streamed to the dataset writer, so memory use
+does not grow with the number of issue times """
+
+import sys
+from typing import Callable, Iterator, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyarrow as pa  # type: ignore
+import pyarrow.dataset as ds  # type: ignore
+from sklearn.preprocessing import MinMaxScaler  # type: ignore
+
+from custom_types import DtIntervalSelection, LoadForecastOptions
+from model.baseline import BASELINE_MODELS, run_baseline
+from model.model import build_model, has_saved_weights, load_saved_weights
+from preprocessing.train_test_splits import train_test_split
+
+NS_PER_HOUR = 3600 * 10**9
+
+
+def localized_ns(dt_interval: DtIntervalSelection, opts: LoadForecastOptions) -> int:
+    """UTC timestamp of a date/hour selection in the data's timezone
+    Args:
+      dt_interval:  date and hour selection
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      int64 UTC nanoseconds, comparable with the index's `asi8`
+    """
+
+    # localized like the loader's index, which accepts the same options
+    localized = pd.DatetimeIndex(
+        [
+            pd.Timestamp(
+                year=dt_interval["year"],
+                month=dt_interval["month"],
+                day=dt_interval["day"],
+                hour=dt_interval["hour"],
+            )
+        ]
+    ).tz_localize(
+        opts["timezone_opts"]["timezone"],
+        ambiguous=opts["timezone_opts"]["ambiguous"],
+        nonexistent=opts["timezone_opts"]["nonexistent"],
+    )
+
+    return int(localized.asi8[0])
+
+
+def make_predictor(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Tuple[Callable[[npt.NDArray], npt.NDArray], str]:
+    """forecast function for the configured model: the saved NN weights, or a
+    baseline fitted on the training split; falls back to the ridge baseline
+    when no NN weights have been saved for this zone
+    Args:
+      data:     scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      function from look-back windows to scaled forecasts, and the name of the
+      model that actually produces them
+    """
+
+    if opts["model"] not in BASELINE_MODELS and has_saved_weights(opts):
+        model = build_model(opts)
+        load_saved_weights(model, opts)
+        return (model.predict_on_batch, opts["model"])
+
+    if opts["model"] not in BASELINE_MODELS:
+        print(
+            f"""warning: no saved {opts['model']} weights for {opts['zone']},
+            exporting ridge baseline forecasts instead."""
+        )
+        opts = {**opts, "model": "ridge"}  # type: ignore
+
+    (train_data, test_data) = train_test_split(data, opts)
+    (baseline, _) = run_baseline(opts, train_data, test_data)
+
+    return (baseline.predict, opts["model"])
+
+
+def forecast_schema(timezone: str) -> pa.Schema:
+    """the export schema with timestamps in the data's timezone
+    Args:
+      timezone:     timezone name, e.g. "US/Eastern"
+    Returns:
+      pyarrow schema
+    """
+    return pa.schema(
+        [
+            ("zone", pa.string()),
+            ("model", pa.string()),
+            ("issue_date", pa.date32()),
+            ("issue_time", pa.timestamp("ns", tz=timezone)),
+            ("target_time", pa.timestamp("ns", tz=timezone)),
+            ("horizon_step", pa.int16()),
+            ("forecast_mw", pa.float32()),
+        ]
+    )
+
+
+def check_exportable(opts: LoadForecastOptions) -> None:
+    """refuse to export without the index repair: look-back windows and target
+    times are taken as consecutive hours, which only holds on the repaired index
+    Args:
+      opts:     LoadForecastOptions object for this run
+    Raises:
+      SystemExit if `repair_index` is not set
+    """
+
+    if not opts.get("repair_index", False):
+        raise sys.exit(
+            """
+            Invalid options.
+            The forecast export needs "repair_index": True, so that every
+            look-back window and horizon covers consecutive hours and the
+            exported target times match the forecast steps.
+            Exiting now.
+            """
+        )
+
+
+def issue_lookbacks(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Tuple[npt.NDArray, npt.NDArray[np.int64], npt.NDArray]:
+    """look-back windows and issue times, and the requested ones among them
+    the issue time is the last observed interval of a look-back window, so the
+    newest data still gets a forecast
+    Args:
+      data:     scaled model data with its tz-aware datetime index
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      (look-back windows as a view into `data`, int64 UTC issue time of each
+      window, positions of the windows every `issue_stride` hours between
+      `issue_start` and `issue_end`)
+    """
+
+    window = opts["window_opts"]["window"]
+    export_opts = opts["export"]
+
+    values = np.asarray(data, dtype=np.float32)
+    lookbacks = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+    if values.ndim > 1:
+        lookbacks = np.moveaxis(lookbacks, -1, 1)
+
+    issue_ns = data.index.asi8[window - 1 :]
+    starts = np.arange(
+        np.searchsorted(issue_ns, localized_ns(export_opts["issue_start"], opts)),
+        np.searchsorted(
+            issue_ns, localized_ns(export_opts["issue_end"], opts), side="right"
+        ),
+        export_opts["issue_stride"],
+    )
+
+    return (lookbacks, issue_ns, starts)
+
+
+def forecast_record_batch(
+    issues: npt.NDArray[np.int64],
+    forecast_mw: npt.NDArray,
+    model_name: str,
+    opts: LoadForecastOptions,
+) -> pa.RecordBatch:
+    """one row per issue time and horizon step, the steps following the issue
+    time at hourly intervals (see `check_exportable`)
+    Args:
+      issues:   int64 UTC issue times
+      forecast_mw:  forecasts of shape (issues, horizon), in MW
+      model_name:   the model that produced the forecasts
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      record batch in the export schema
+    """
+
+    horizon = opts["window_opts"]["horizon"]
+    schema = forecast_schema(opts["timezone_opts"]["timezone"])
+    steps = np.arange(1, horizon + 1, dtype=np.int16)
+    local_dates = (
+        pd.DatetimeIndex(issues, tz="UTC")
+        .tz_convert(opts["timezone_opts"]["timezone"])
+        .tz_localize(None)
+        .values.astype("datetime64[D]")
+    )
+
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(np.full(forecast_mw.size, opts["zone"])),
+            pa.array(np.full(forecast_mw.size, model_name)),
+            pa.array(np.repeat(local_dates, horizon), type=pa.date32()),
+            pa.array(
+                np.repeat(issues, horizon).view("datetime64[ns]"),
+                type=schema.field("issue_time").type,
+            ),
+            pa.array(
+                (issues[:, None] + steps[None, :].astype(np.int64) * NS_PER_HOUR)
+                .ravel()
+                .view("datetime64[ns]"),
+                type=schema.field("target_time").type,
+            ),
+            pa.array(np.tile(steps, len(issues))),
+            pa.array(forecast_mw.ravel().astype(np.float32)),
+        ],
+        schema=schema,
+    )
+
+
+def forecast_record_batches(
+    data: Union[pd.Series, pd.DataFrame],
+    predict: Callable[[npt.NDArray], npt.NDArray],
+    model_name: str,
+    scaler: MinMaxScaler,
+    opts: LoadForecastOptions,
+) -> Iterator[pa.RecordBatch]:
+    """forecast every requested issue time, one record batch per batch of issues
+    Args:
+      data:     scaled model data with its tz-aware datetime index
+      predict:  maps look-back windows to scaled forecasts (model or baseline)
+      model_name:   the model behind `predict`, recorded on every row
+      scaler:   the min max scaler, to report forecasts in MW
+      opts:     LoadForecastOptions object for this run
+    Yields:
+      record batches in the export schema
+    """
+
+    (lookbacks, issue_ns, starts) = issue_lookbacks(data, opts)
+    batch_size = opts["export"]["batch_size"]
+
+    for batch_start in range(0, len(starts), batch_size):
+        batch = starts[batch_start : batch_start + batch_size]
+        forecast = np.asarray(predict(np.array(lookbacks[batch])), dtype=np.float32)
+        forecast_mw = scaler.inverse_transform(forecast.reshape(-1, 1)).reshape(
+            forecast.shape
+        )
+
+        yield forecast_record_batch(issue_ns[batch], forecast_mw, model_name, opts)
+
+
+def write_forecasts(
+    batches: Iterator[pa.RecordBatch], schema: pa.Schema, base_dir: str
+) -> None:
+    """stream record batches into a hive-partitioned (zone, issue_date) Parquet
+    dataset, replacing the partitions that are written again
+    Args:
+      batches:  record batches in the export schema
+      schema:   the export schema
+      base_dir: root folder of the dataset
+    """
+
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, batches),
+        base_dir,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([schema.field("zone"), schema.field("issue_date")]),
+            flavor="hive",
+        ),
+        existing_data_behavior="delete_matching",
+        max_open_files=64,
+    )
@@ -1,8 +1,10 @@
 """ NN time series load forecast model """
 
+import json
 import os
 import random
 import sys
+from typing import Optional
 
 import matplotlib.pyplot as plt  # type: ignore
 import numpy as np
@@ -11,12 +13,154 @@ import tensorflow as tf  # type: ignore
 from sklearn.preprocessing import MinMaxScaler  # type: ignore
 
 from config import MODEL_OUT_PATH
-from custom_types import LoadForecastOptions
+from custom_types import LoadForecastOptions, ModelParams
 from model.callbacks import (
+    AsyncWeightsCheckpoint,
     best_val_loss_checkpoint,
     early_stopping,
+    latest_weights_checkpoint,
+    load_weights_checkpoint,
     reduce_lr_on_plateau,
+    resume_step_checkpoint,
 )
+from model.performance import compile_kwargs, get_performance_opts
+from preprocessing.scaler import save_scaler, scaler_filepath
+
+DEFAULT_MODEL_PARAMS: ModelParams = {
+    "filters": 128,
+    "dense_units": 512,
+    "lstm_units": 16,
+}
+
+
+def model_filepath(opts: LoadForecastOptions) -> str:
+    """the path to the best saved model for this model type and zone
+    Args:
+      opts:     load forecast options object
+    Returns:
+      filepath in string format
+    """
+    return os.path.join(MODEL_OUT_PATH, f"{opts['model']}{opts['zone']}.hdf5")
+
+
+def uses_async_checkpoint(opts: LoadForecastOptions) -> bool:
+    """whether the best weights are saved by AsyncWeightsCheckpoint
+    Args:
+      opts:     load forecast options object
+    Returns:
+      True for weights-only .npz checkpoints, False for the .hdf5 model
+    """
+    return "checkpoint" in opts and opts["checkpoint"]["asynchronous"]
+
+
+def checkpoint_callback(
+    opts: LoadForecastOptions, initial_value_threshold: Optional[float] = None
+) -> tf.keras.callbacks.Callback:
+    """callback that saves the best weights, using the checkpoint options
+    Args:
+      opts:     load forecast options object
+      initial_value_threshold: val loss a new checkpoint must beat, if any
+    Returns:
+      AsyncWeightsCheckpoint or ModelCheckpoint callback
+    """
+
+    if uses_async_checkpoint(opts):
+        return AsyncWeightsCheckpoint(
+            f"{opts['model']}{opts['zone']}",
+            keep_last=opts["checkpoint"]["keep_last"],
+            save_freq_steps=opts["checkpoint"]["save_freq_steps"] or None,
+            initial_value_threshold=initial_value_threshold,
+        )
+    return best_val_loss_checkpoint(
+        os.path.basename(model_filepath(opts)),
+        initial_value_threshold=initial_value_threshold,
+    )
+
+
+def has_saved_weights(opts: LoadForecastOptions) -> bool:
+    """whether a training run has saved the best weights
+    Args:
+      opts:     load forecast options object
+    Returns:
+      True if there is a checkpoint to load
+    """
+
+    if uses_async_checkpoint(opts):
+        return latest_weights_checkpoint(f"{opts['model']}{opts['zone']}") is not None
+    return os.path.exists(model_filepath(opts))
+
+
+def load_saved_weights(model: tf.keras.Sequential, opts: LoadForecastOptions) -> None:
+    """load the best saved weights into a built model
+    Args:
+      model:    model built with the same options as the saved one
+      opts:     load forecast options object
+    """
+
+    if uses_async_checkpoint(opts):
+        filepath = latest_weights_checkpoint(f"{opts['model']}{opts['zone']}")
+        if filepath is None:
+            raise sys.exit(
+                f"""
+                No saved {opts['model']} weights for {opts['zone']}.
+                Train the model first.
+                Exiting now.
+                """
+            )
+        load_weights_checkpoint(model, filepath)
+    else:
+        model.load_weights(model_filepath(opts))
+
+
+def interrupted_checkpoint(opts: LoadForecastOptions) -> Optional[str]:
+    """the newest step checkpoint of a training run that did not finish
+    Args:
+      opts:     load forecast options object
+    Returns:
+      filepath in string format, or None if there is nothing to resume
+    """
+
+    if not uses_async_checkpoint(opts) or not opts["checkpoint"]["save_freq_steps"]:
+        return None
+    return latest_weights_checkpoint(f"{opts['model']}{opts['zone']}", kind="step")
+
+
+def state_filepath(opts: LoadForecastOptions) -> str:
+    """the path to the reference validation loss of the last full training run
+    Args:
+      opts:     load forecast options object
+    Returns:
+      filepath in string format
+    """
+    return os.path.join(MODEL_OUT_PATH, f"{opts['model']}{opts['zone']}_state.json")
+
+
+def can_fine_tune(opts: LoadForecastOptions) -> bool:
+    """whether fine-tuning is enabled and a full training run has saved
+    the model, scaler and reference validation loss it starts from
+    Args:
+      opts:     load forecast options object
+    Returns:
+      True if the run can warm start
+    """
+    return (
+        "fine_tune" in opts
+        and opts["fine_tune"]["enabled"]
+        and has_saved_weights(opts)
+        and os.path.exists(state_filepath(opts))
+        and os.path.exists(scaler_filepath(opts))
+    )
+
+
+def interactive_plots(opts: LoadForecastOptions) -> bool:
+    """whether to show the interactive prediction plot after training,
+    rather than leaving plots to the headless report
+    Args:
+      opts:     load forecast options object
+    Returns:
+      True to call plt.show()
+    """
+    return not ("report" in opts and opts["report"]["headless"])
 
 
 def plot_prediction(
@@ -66,9 +210,7 @@ def predict_using_trained_model(
     rnd_batch = random.randint(0, len(list(test_dataset)[0][0]) - 1)
     rnd_sample = random.randint(0, len(list(test_dataset)) - 1)
 
-    model.load_weights(
-        os.path.join(MODEL_OUT_PATH, f"{opts['model']}{opts['zone']}.hdf5")
-    )
+    load_saved_weights(model, opts)
     pred = model.predict(
         tf.expand_dims(list(test_dataset)[rnd_sample][0][rnd_batch], axis=0)
     )
@@ -76,54 +218,210 @@ def predict_using_trained_model(
     plot_prediction(pred, test_dataset, scaler, rnd_batch, rnd_sample)
 
 
+def get_model_params(opts: LoadForecastOptions) -> ModelParams:
+    """layer sizes for this run, falling back to the defaults
+    Args:
+      opts: LoadForecastOptions object for this run
+    Returns:
+      complete ModelParams object
+    """
+    return {**DEFAULT_MODEL_PARAMS, **opts.get("model_params", {})}  # type: ignore
+
+
+def build_model(opts: LoadForecastOptions) -> tf.keras.Sequential:
+    """build the model type selected in the options
+    Args:
+      opts: LoadForecastOptions object for this run
+    Returns:
+      uncompiled model
+    Raises:
+      SystemExit if no valid model type is specified
+    """
+
+    if opts["model"] == "cnn":
+        return cnn_model(opts)
+    if opts["model"] == "lstm":
+        return lstm_model(opts)
+    if opts["model"] == "student":
+        return student_model(opts)
+    raise sys.exit(
+        """
+        Invalid options.
+        Must specify cnn, lstm or student model type in config options
+        (the seasonal_naive, seasonal_profile and ridge baselines are not NNs).
+        see configuration.py
+        Exiting now.
+        """
+    )
+
+
+def compile_model(
+    model: tf.keras.Sequential,
+    opts: LoadForecastOptions,
+    learning_rate: float = 0.001,
+) -> tf.keras.Sequential:
+    """compile the model using the loss, metrics and performance options
+    Args:
+      model:    the uncompiled model
+      opts:     LoadForecastOptions object for this run
+      learning_rate:    initial Adam learning rate
+    Returns:
+      the compiled model
+    """
+
+    model.compile(
+        loss=opts["loss"],
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        metrics=opts["metrics"],
+        **compile_kwargs(get_performance_opts(opts)),
+    )
+
+    return model
+
+
+def fine_tune_model(
+    opts: LoadForecastOptions,
+    fine_tune_dataset: tf.data.Dataset,
+    test_dataset: tf.data.Dataset,
+) -> Optional[tf.keras.Sequential]:
+    """warm start from the saved model and train a few epochs on recent windows
+    Args:
+      opts: LoadForecastOptions object for this run
+      fine_tune_dataset: recent + replayed training windows
+      test_dataset: test data w/ labels (windows + horizons)
+    Returns:
+      the fine-tuned model, or None if validation loss drifted past the threshold
+      since the last full training run
+    """
+
+    model = build_model(opts)
+    load_saved_weights(model, opts)
+    model = compile_model(model, opts, opts["fine_tune"]["learning_rate"])
+
+    with open(state_filepath(opts), "r", encoding="utf-8") as state_file:
+        reference_val_loss = json.load(state_file)["val_loss"]
+    val_loss = model.evaluate(test_dataset, verbose=0, return_dict=True)["loss"]
+    drift = val_loss / reference_val_loss - 1
+
+    if drift > opts["fine_tune"]["drift_threshold"]:
+        print(
+            f"""validation loss drifted {drift:.1%} since the last full training run
+            (threshold {opts['fine_tune']['drift_threshold']:.1%}), retraining."""
+        )
+        return None
+
+    model.fit(
+        fine_tune_dataset,
+        epochs=opts["fine_tune"]["epochs"],
+        validation_data=test_dataset,
+        verbose=1,
+        callbacks=[checkpoint_callback(opts, initial_value_threshold=val_loss)],
+    )
+
+    return model
+
+
+def check_trainable(opts: LoadForecastOptions) -> None:
+    """refuse to train the student model on the actuals, which would overwrite
+    the distilled weights (and the saved scaler and state)
+    Args:
+      opts:     load forecast options object
+    Raises:
+      SystemExit for the student model
+    """
+
+    if opts["model"] == "student":
+        raise sys.exit(
+            """
+            Invalid options.
+            The student model is only trained by distillation,
+            use `python src/distill.py`; its saved weights can then be served
+            with "model": "student" by the export and report commands.
+            Exiting now.
+            """
+        )
+
+
+def run_fine_tune(
+    opts: LoadForecastOptions,
+    fine_tune_dataset: tf.data.Dataset,
+    test_dataset: tf.data.Dataset,
+    scaler,
+) -> bool:
+    """warm start the load forecast model from the last full training run
+    Args:
+      opts: LoadForecastOptions object for this run
+      fine_tune_dataset: recent + replayed training windows, scaled with the
+        saved scaler
+      test_dataset: test data w/ labels (windows + horizons)
+      scaler: the saved min max scaler
+    Returns:
+      False if validation loss has drifted and the model needs full training,
+      which should refit the scaler first
+    """
+
+    tf.keras.backend.clear_session()
+
+    model = fine_tune_model(opts, fine_tune_dataset, test_dataset)
+    if model is None:
+        return False
+
+    if interactive_plots(opts):
+        predict_using_trained_model(model, opts, test_dataset, scaler)
+
+    return True
+
+
 def run_model(
     opts: LoadForecastOptions,
     train_dataset: tf.data.Dataset,
     test_dataset: tf.data.Dataset,
     scaler,
 ) -> None:
-    """run the load forecast model
+    """run the load forecast model, training from scratch, or resuming an
+    interrupted run from its last step checkpoint
     Args:
       opts: LoadForecastOptions object for this run
       train_dataset: training data w/ labels (windows + horizons)
       test_dataset: test data w/ labels (windows + horizons)
+      scaler: the min max scaler fitted for this run, saved for fine-tuning
     Raises:
-      SystemExit if no valid model type is specified
+      SystemExit if no valid model type is specified, or for the student model
     """
 
+    check_trainable(opts)
+
     tf.keras.backend.clear_session()
 
-    if opts["model"] == "cnn":
-        model = cnn_model(opts)
-    elif opts["model"] == "lstm":
-        model = lstm_model(opts)
-    else:
-        raise sys.exit(
-            """
-            Invalid options.
-            Must specify cnn or lstm model type in config options.
-            see configuration.py
-            Exiting now.
-            """
-        )
+    model = compile_model(build_model(opts), opts)
 
-    model.compile(
-        loss=opts["loss"], optimizer=tf.keras.optimizers.Adam(), metrics=opts["metrics"]
-    )
+    initial_epoch = 0
+    best_val_loss: Optional[float] = None
+    step_checkpoint = interrupted_checkpoint(opts)
+    if step_checkpoint is not None:
+        (initial_epoch, best_val_loss) = resume_step_checkpoint(model, step_checkpoint)
+        print(f"resuming at epoch {initial_epoch + 1} from {step_checkpoint}")
 
-    model.fit(
+    history = model.fit(
         train_dataset,
+        initial_epoch=initial_epoch,
         epochs=opts["epochs"],
         validation_data=test_dataset,
         verbose=1,
         callbacks=[
-            best_val_loss_checkpoint(f"{opts['model']}{opts['zone']}.hdf5"),
+            checkpoint_callback(opts, initial_value_threshold=best_val_loss),
             early_stopping(opts["es_patience"]),
             reduce_lr_on_plateau(opts["lr_patience"]),
         ],
     )
 
-    predict_using_trained_model(model, opts, test_dataset, scaler)
+    # reference point for fine-tuning runs
+    save_scaler(scaler, opts)
+    with open(state_filepath(opts), "w", encoding="utf-8") as state_file:
+        json.dump({"val_loss": min(history.history["val_loss"])}, state_file)
+
+    if interactive_plots(opts):
+        predict_using_trained_model(model, opts, test_dataset, scaler)
 
 
 def cnn_model(
@@ -138,6 +436,8 @@ def cnn_model(
       Conv1D model built using the Sequential API
     """
 
+    params = get_model_params(opts)
+
     model = tf.keras.Sequential(
         [
             tf.keras.layers.Input(
@@ -145,7 +445,7 @@ def cnn_model(
                 name="input",
             ),
             tf.keras.layers.Conv1D(
-                filters=128,
+                filters=params["filters"],
                 kernel_size=5,
                 strides=1,
                 padding="causal",
@@ -154,7 +454,7 @@ def cnn_model(
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.MaxPooling1D(2),
             tf.keras.layers.Conv1D(
-                filters=128,
+                filters=params["filters"],
                 kernel_size=5,
                 strides=1,
                 padding="causal",
@@ -163,9 +463,11 @@ def cnn_model(
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.MaxPooling1D(2),
             tf.keras.layers.Flatten(name="cnn_flatten"),
-            tf.keras.layers.Dense(512, activation="relu"),
+            tf.keras.layers.Dense(params["dense_units"], activation="relu"),
             tf.keras.layers.Dropout(0.5),
-            tf.keras.layers.Dense(opts["window_opts"]["horizon"], name="output"),
+            tf.keras.layers.Dense(
+                opts["window_opts"]["horizon"], name="output", dtype="float32"
+            ),
         ]
     )
 
@@ -186,6 +488,8 @@ def lstm_model(
       LSTM model built using the Sequential API
     """
 
+    params = get_model_params(opts)
+
     model = tf.keras.Sequential(
         [
             tf.keras.layers.Input(
@@ -193,13 +497,74 @@ def lstm_model(
                 name="input",
             ),
             tf.keras.layers.Bidirectional(
-                tf.keras.layers.LSTM(16, return_sequences=True, name="lstm_bidir1")
+                tf.keras.layers.LSTM(
+                    params["lstm_units"], return_sequences=True, name="lstm_bidir1"
+                )
             ),
             tf.keras.layers.Bidirectional(
-                tf.keras.layers.LSTM(16, return_sequences=True, name="lstm_bidir1")
+                tf.keras.layers.LSTM(
+                    params["lstm_units"], return_sequences=True, name="lstm_bidir1"
+                )
             ),
             tf.keras.layers.Flatten(),
-            tf.keras.layers.Dense(opts["window_opts"]["horizon"], name="output"),
+            tf.keras.layers.Dense(
+                opts["window_opts"]["horizon"], name="output", dtype="float32"
+            ),
+        ]
+    )
+
+    model.summary()
+
+    return model
+
+
+def student_model(
+    opts: LoadForecastOptions,
+) -> tf.keras.Sequential:
+    """creates a small, fast student model for distillation from cnn/lstm
+    "tcn": dilated causal Conv1D stack whose receptive field covers the window,
+    read out at the last time step; "mlp": dense layers on average-pooled lags
+    Args:
+      opts: LoadForecastOptions object for this run
+    Returns:
+      student model built using the Sequential API
+    """
+
+    student_opts = opts["student"]
+    window = opts["window_opts"]["window"]
+
+    if student_opts["architecture"] == "tcn":
+        dilations = [2**i for i in range(max(int(np.ceil(np.log2(window))), 1))]
+        hidden_layers = [
+            tf.keras.layers.Conv1D(
+                filters=student_opts["filters"],
+                kernel_size=2,
+                dilation_rate=dilation,
+                padding="causal",
+                activation="relu",
+            )
+            for dilation in dilations
+        ] + [
+            tf.keras.layers.Cropping1D((window - 1, 0)),
+            tf.keras.layers.Flatten(name="tcn_last_step"),
+        ]
+    else:
+        hidden_layers = [
+            tf.keras.layers.AveragePooling1D(student_opts["downsample"]),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(student_opts["hidden_units"], activation="relu"),
+        ]
+
+    model = tf.keras.Sequential(
+        [
+            tf.keras.layers.Input(
+                (window, 1 + len(opts["additional_features"])),
+                name="input",
+            ),
+            *hidden_layers,
+            tf.keras.layers.Dense(
+                opts["window_opts"]["horizon"], name="output", dtype="float32"
+            ),
         ]
     )
 
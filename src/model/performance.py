@@ -0,0 +1,94 @@
+""" CPU performance settings applied to the TF runtime and Keras """
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import tensorflow as tf  # type: ignore
+
+from config import DEFAULT_PERFORMANCE
+from custom_types import LoadForecastOptions, PerformanceOpts
+
+
+def get_performance_opts(opts: LoadForecastOptions) -> PerformanceOpts:
+    """performance options for this run, falling back to TF defaults
+    Args:
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      complete PerformanceOpts object
+    """
+    return {**DEFAULT_PERFORMANCE, **opts.get("performance", {})}  # type: ignore
+
+
+def configure_runtime(perf: PerformanceOpts) -> None:
+    """apply thread pool and precision settings to the TF runtime
+    must run before TensorFlow executes any op, i.e. before the data pipeline
+    Args:
+      perf:     performance options object
+    """
+
+    if perf["intra_op_threads"] > 0:
+        tf.config.threading.set_intra_op_parallelism_threads(perf["intra_op_threads"])
+    if perf["inter_op_threads"] > 0:
+        tf.config.threading.set_inter_op_parallelism_threads(perf["inter_op_threads"])
+
+    tf.keras.mixed_precision.set_global_policy(
+        "mixed_bfloat16" if perf["mixed_bfloat16"] else "float32"
+    )
+
+    onednn_env = os.environ.get("TF_ENABLE_ONEDNN_OPTS")
+    if onednn_env is not None and (onednn_env == "1") != perf["onednn_opts"]:
+        print(
+            f"""warning: onednn_opts={perf['onednn_opts']} but
+            TF_ENABLE_ONEDNN_OPTS={onednn_env} was already read by TensorFlow.
+            Set the environment variable before starting the program."""
+        )
+
+
+def configure_worker_runtime(opts: LoadForecastOptions, threads: int) -> None:
+    """cap the TF thread pools of a worker process before it runs any op,
+    used as a process pool initializer
+    Args:
+      opts:     LoadForecastOptions object for this run
+      threads:  intra-op threads for this worker
+    """
+    configure_runtime(
+        {
+            **get_performance_opts(opts),
+            "intra_op_threads": threads,
+            "inter_op_threads": 1,
+        }
+    )
+
+
+def worker_pool(
+    opts: LoadForecastOptions, workers: int, threads: int
+) -> ProcessPoolExecutor:
+    """spawned process pool whose workers cap their TF thread pools on start
+    Args:
+      opts:     LoadForecastOptions object for this run
+      workers:  number of worker processes
+      threads:  intra-op threads for each worker
+    Returns:
+      ProcessPoolExecutor, to use as a context manager
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=configure_worker_runtime,
+        initargs=(opts, threads),
+    )
+
+
+def compile_kwargs(perf: PerformanceOpts) -> Dict[str, Any]:
+    """keyword arguments for `model.compile`
+    Args:
+      perf:     performance options object
+    Returns:
+      dict of compile settings
+    """
+    return {
+        "jit_compile": perf["jit_compile"],
+        "steps_per_execution": perf["steps_per_execution"],
+    }
@@ -0,0 +1,97 @@
+""" headless (Agg backend) diagnostic plots, rendered in report worker processes
+kept free of TensorFlow imports so the workers start quickly """
+
+from typing import List, Tuple
+
+import matplotlib  # type: ignore
+import matplotlib.pyplot as plt  # type: ignore
+import numpy as np
+import numpy.typing as npt
+
+
+def use_agg_backend() -> None:
+    """switch a report worker to the Agg backend, used as a process pool
+    initializer so the interactive backend of the main process is left alone
+    """
+    matplotlib.use("Agg")
+
+
+def render_prediction(
+    actual: npt.NDArray, predicted: npt.NDArray, title: str, path: str
+) -> str:
+    """plot one window's predicted and actual load over the horizon
+    Args:
+      actual:   actual MW, shape (horizon,)
+      predicted:    forecast MW, shape (horizon,)
+      title:    plot title
+      path:     png file path
+    Returns:
+      the png file path
+    """
+
+    fig, axes = plt.subplots(figsize=(8, 4))
+    axes.plot(predicted, label="predicted")
+    axes.plot(actual, label="actual")
+    axes.legend(loc="upper left")
+    axes.set_xlabel("Hour")
+    axes.set_ylabel("MW")
+    axes.set_title(title)
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+
+    return path
+
+
+def render_error_by_horizon(abs_error: npt.NDArray, path: str) -> str:
+    """plot the mean and 10-90% band of absolute error at each horizon step
+    Args:
+      abs_error:    quantiles of absolute error in MW, shape (3, horizon)
+                    rows are the 10th percentile, mean and 90th percentile
+      path:     png file path
+    Returns:
+      the png file path
+    """
+
+    fig, axes = plt.subplots(figsize=(8, 4))
+    steps = np.arange(1, abs_error.shape[1] + 1)
+    axes.fill_between(steps, abs_error[0], abs_error[2], alpha=0.3, label="10-90%")
+    axes.plot(steps, abs_error[1], label="mean")
+    axes.legend(loc="upper left")
+    axes.set_xlabel("Horizon step (hour)")
+    axes.set_ylabel("Absolute error (MW)")
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+
+    return path
+
+
+def render_hour_of_day_heatmap(mean_abs_error: npt.NDArray, path: str) -> str:
+    """heatmap of mean absolute error by target hour of day and horizon day
+    Args:
+      mean_abs_error:   MW, shape (24, horizon days)
+      path:     png file path
+    Returns:
+      the png file path
+    """
+
+    fig, axes = plt.subplots(figsize=(8, 6))
+    image = axes.imshow(mean_abs_error, aspect="auto", origin="lower", cmap="viridis")
+    fig.colorbar(image, ax=axes, label="Mean absolute error (MW)")
+    axes.set_xlabel("Horizon day")
+    axes.set_ylabel("Target hour of day")
+    fig.savefig(path, dpi=80)
+    plt.close(fig)
+
+    return path
+
+
+def render_predictions(
+    tasks: List[Tuple[npt.NDArray, npt.NDArray, str, str]]
+) -> List[str]:
+    """render a chunk of predicted-vs-actual plots in one worker call
+    Args:
+      tasks:    list of `render_prediction` arguments
+    Returns:
+      list of png file paths
+    """
+    return [render_prediction(*task) for task in tasks]
@@ -0,0 +1,223 @@
+""" headless diagnostic report: predicted-vs-actual, error-by-horizon and
+hour-of-day error plots rendered in a process pool, plus an HTML index;
+workers only receive small NumPy arrays """
+
+import html
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler  # type: ignore
+
+from config import REPORT_OUT_PATH
+from custom_types import LoadForecastOptions
+from model.export import make_predictor
+from model.plots import (
+    render_error_by_horizon,
+    render_hour_of_day_heatmap,
+    render_predictions,
+    use_agg_backend,
+)
+from preprocessing.train_test_splits import train_test_split
+from preprocessing.windowing import make_window_arrays
+
+PREDICT_BATCH_SIZE = 1024
+
+
+def write_index(paths: List[str], title: str, out_path: str) -> str:
+    """write an HTML page linking every plot of the report
+    Args:
+      paths:    png file paths, in display order
+      title:    page title
+      out_path: report folder
+    Returns:
+      path of the index.html file
+    """
+
+    images = "\n".join(
+        f'<figure><img src="{html.escape(os.path.basename(path))}" loading="lazy">'
+        f"<figcaption>{html.escape(os.path.basename(path))}</figcaption></figure>"
+        for path in paths
+    )
+    index_path = os.path.join(out_path, "index.html")
+    with open(index_path, "w", encoding="utf-8") as index_file:
+        index_file.write(
+            f"<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(title)}</title></head><body>"
+            f"<h1>{html.escape(title)}</h1>\n{images}\n</body></html>"
+        )
+
+    return index_path
+
+
+def test_forecasts_mw(
+    data: Union[pd.Series, pd.DataFrame],
+    predict: Callable[[npt.NDArray], npt.NDArray],
+    scaler: MinMaxScaler,
+    opts: LoadForecastOptions,
+) -> Tuple[npt.NDArray, npt.NDArray, pd.DatetimeIndex]:
+    """forecast every test window, `PREDICT_BATCH_SIZE` windows at a time
+    Args:
+      data:     scaled model data with its tz-aware datetime index
+      predict:  maps look-back windows to scaled forecasts (model or baseline)
+      scaler:   the min max scaler, to report MW
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      (actual MW, predicted MW) of shape (windows, horizon), and the test index
+    """
+
+    (_, test_data) = train_test_split(data, opts)
+    (windows, horizons) = make_window_arrays(
+        np.asarray(test_data, dtype=np.float32), opts["window_opts"]
+    )
+
+    predicted = np.concatenate(
+        [
+            np.asarray(predict(np.array(windows[start : start + PREDICT_BATCH_SIZE])))
+            for start in range(0, len(windows), PREDICT_BATCH_SIZE)
+        ]
+    )
+
+    return (
+        scaler.inverse_transform(horizons.reshape(-1, 1)).reshape(horizons.shape),
+        scaler.inverse_transform(predicted.reshape(-1, 1)).reshape(predicted.shape),
+        pd.DatetimeIndex(test_data.index),
+    )
+
+
+def error_summaries(
+    abs_error: npt.NDArray, test_index: pd.DatetimeIndex, opts: LoadForecastOptions
+) -> Tuple[npt.NDArray, npt.NDArray]:
+    """reduce the absolute errors to the small arrays behind the summary plots
+    Args:
+      abs_error:    absolute MW errors of shape (windows, horizon)
+      test_index:   datetime index of the test split
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      (10th percentile / mean / 90th percentile error by horizon step,
+      mean error by target hour of day and horizon day)
+    """
+
+    horizon = opts["window_opts"]["horizon"]
+
+    error_quantiles = np.stack(
+        [
+            np.percentile(abs_error, 10, axis=0),
+            abs_error.mean(axis=0),
+            np.percentile(abs_error, 90, axis=0),
+        ]
+    )
+    target_hours = np.lib.stride_tricks.sliding_window_view(
+        test_index.hour.to_numpy()[opts["window_opts"]["window"] :], horizon
+    )[: len(abs_error)]
+    horizon_days = np.arange(horizon) // 24
+    cells = target_hours * (horizon_days[-1] + 1) + horizon_days[None, :]
+    n_cells = 24 * (horizon_days[-1] + 1)
+    heatmap = (
+        np.bincount(cells.ravel(), weights=abs_error.ravel(), minlength=n_cells)
+        / np.maximum(np.bincount(cells.ravel(), minlength=n_cells), 1)
+    ).reshape(24, -1)
+
+    return (error_quantiles, heatmap)
+
+
+def render_report(
+    summaries: Tuple[npt.NDArray, npt.NDArray],
+    prediction_tasks: List[Tuple[npt.NDArray, npt.NDArray, str, str]],
+    out_path: str,
+    workers: int,
+) -> List[str]:
+    """render the summary and prediction plots with the Agg backend across
+    `workers` spawned processes
+    Args:
+      summaries:    (error quantiles by horizon, hour-of-day heatmap)
+      prediction_tasks: (actual, predicted, title, png path) of each sample
+      out_path:     report folder
+      workers:      number of rendering processes
+    Returns:
+      png paths, the summary plots first
+    """
+
+    chunks = [prediction_tasks[i::workers] for i in range(workers)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=use_agg_backend,
+    ) as executor:
+        summary_futures = [
+            executor.submit(
+                render_error_by_horizon,
+                summaries[0],
+                os.path.join(out_path, "error_by_horizon.png"),
+            ),
+            executor.submit(
+                render_hour_of_day_heatmap,
+                summaries[1],
+                os.path.join(out_path, "error_by_hour_of_day.png"),
+            ),
+        ]
+        prediction_paths = sorted(
+            path
+            for chunk_paths in executor.map(render_predictions, chunks)
+            for path in chunk_paths
+        )
+        summary_paths = [future.result() for future in summary_futures]
+
+    return summary_paths + prediction_paths
+
+
+def write_report(
+    data: Union[pd.Series, pd.DataFrame],
+    scaler: MinMaxScaler,
+    opts: LoadForecastOptions,
+) -> str:
+    """forecast every test window with the saved model (or baseline) and render
+    the diagnostic plots in parallel into out/report/{model}{zone}, named after
+    the model that produced the forecasts (ridge, if no NN weights are saved)
+    Args:
+      data:     scaled model data with its tz-aware datetime index
+      scaler:   the min max scaler, to plot MW
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      path of the report's index.html file
+    """
+
+    (predict, model_name) = make_predictor(data, opts)
+    out_path = os.path.join(REPORT_OUT_PATH, f"{model_name}{opts['zone']}")
+    os.makedirs(out_path, exist_ok=True)
+
+    (actual_mw, predicted_mw, test_index) = test_forecasts_mw(
+        data, predict, scaler, opts
+    )
+    # summaries are reduced here so the workers only get small arrays
+    summaries = error_summaries(
+        np.abs(predicted_mw - actual_mw).astype(np.float32), test_index, opts
+    )
+
+    issue_times = test_index[opts["window_opts"]["window"] - 1 :]
+    samples = np.unique(
+        np.linspace(0, len(actual_mw) - 1, opts["report"]["samples"]).astype(int)
+    )
+    prediction_tasks = [
+        (
+            actual_mw[sample].astype(np.float32),
+            predicted_mw[sample].astype(np.float32),
+            f"{model_name} {opts['zone']} issued {issue_times[sample]}",
+            os.path.join(out_path, f"prediction_{sample:06d}.png"),
+        )
+        for sample in samples
+    ]
+
+    index_path = write_index(
+        render_report(summaries, prediction_tasks, out_path, opts["report"]["workers"]),
+        f"{model_name} {opts['zone']} forecast report",
+        out_path,
+    )
+    print(f"report written to {index_path}")
+
+    return index_path
@@ -0,0 +1,386 @@
+""" Hyperband hyperparameter search over the cnn/lstm model options
+trials at each rung train concurrently in worker processes, the trial history
+is persisted after every trial so an interrupted search can resume """
+
+import json
+import math
+import os
+import random
+from concurrent.futures import Executor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf  # type: ignore
+
+from config import MODEL_OUT_PATH
+from custom_types import LoadForecastOptions, SearchSpace
+from model.model import build_model, compile_model
+from model.performance import worker_pool
+from preprocessing.pipeline import (
+    make_windowed_datasets,
+    open_feature_matrix,
+    write_feature_matrix,
+)
+from preprocessing.train_test_splits import train_test_rows, validation_split
+
+SEARCH_OUT_PATH = os.path.join(MODEL_OUT_PATH, "search")
+
+HISTORY_FILENAME = "history.json"
+
+
+def hyperband_brackets(max_epochs: int, eta: int) -> List[Tuple[int, int, int]]:
+    """the successive halving brackets of a Hyperband search
+    Args:
+      max_epochs:   epochs given to a trial that survives every rung
+      eta:      fraction (1/eta) of trials kept at each rung
+    Returns:
+      list of (bracket, number of trials, epochs at the first rung) tuples
+    """
+
+    s_max = int(math.log(max_epochs) / math.log(eta) + 1e-9)
+    return [
+        (
+            bracket,
+            int(math.ceil((s_max + 1) / (bracket + 1) * eta**bracket)),
+            max(int(max_epochs * eta ** (-bracket)), 1),
+        )
+        for bracket in range(s_max, -1, -1)
+    ]
+
+
+def sample_params(space: SearchSpace, rng: random.Random) -> Dict[str, int]:
+    """draw one trial's hyperparameters from the search space
+    Args:
+      space:    candidate values for each hyperparameter
+      rng:      seeded random generator, so brackets are reproducible on resume
+    Returns:
+      dict of hyperparameter values
+    """
+    return {name: rng.choice(values) for name, values in space.items()}  # type: ignore
+
+
+def trial_options(
+    opts: LoadForecastOptions, params: Dict[str, int]
+) -> LoadForecastOptions:
+    """forecast options for one trial
+    Args:
+      opts:     LoadForecastOptions object for this run
+      params:   the trial's hyperparameters
+    Returns:
+      LoadForecastOptions object with the trial's window and layer sizes
+    """
+    return {  # type: ignore
+        **opts,
+        "window_opts": {
+            **opts["window_opts"],
+            "window": params["window"],
+            "horizon": params["horizon"],
+        },
+        "model_params": {
+            "filters": params["filters"],
+            "dense_units": params["dense_units"],
+            "lstm_units": params["lstm_units"],
+        },
+    }
+
+
+def checkpoint_path(trial_id: str, epochs: int) -> str:
+    """path to a trial's model after training for some number of epochs
+    Args:
+      trial_id:     the trial name
+      epochs:       epochs trained so far
+    Returns:
+      filepath in string format
+    """
+    return os.path.join(SEARCH_OUT_PATH, f"{trial_id}_{epochs}.h5")
+
+
+def remove_checkpoint(trial_id: str, epochs: int) -> None:
+    """delete a trial's checkpoint once it is superseded or the trial is eliminated
+    Args:
+      trial_id:     the trial name
+      epochs:       epochs trained at the checkpoint
+    """
+    if os.path.exists(checkpoint_path(trial_id, epochs)):
+        os.remove(checkpoint_path(trial_id, epochs))
+
+
+def trial_rows(n_rows: int, opts: LoadForecastOptions) -> Tuple[slice, slice, slice]:
+    """row slices of a trial: the training rows are split again, so trials are
+    ranked on the last `1 - train_pct` share of them and the test rows stay
+    unseen until the chosen trial is scored
+    Args:
+      n_rows:   number of rows in the feature matrix
+      opts:     the trial's LoadForecastOptions object
+    Returns:
+      (fitting slice, validation slice, test slice)
+    """
+
+    (train_rows, test_rows) = train_test_rows(n_rows, opts)
+
+    return (*validation_split(train_rows, opts), test_rows)
+
+
+def run_trial(
+    trial_id: str,
+    params: Dict[str, int],
+    rung_epochs: Tuple[int, int],
+    features_path: str,
+    opts: LoadForecastOptions,
+) -> float:
+    """train a trial up to the rung's epochs, resuming from its checkpoint
+    Args:
+      trial_id:     the trial name
+      params:       the trial's hyperparameters
+      rung_epochs:  (epochs already trained at the previous rung,
+                    epochs to train up to at this rung)
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      validation loss after the last epoch
+    """
+
+    (initial_epoch, epochs) = rung_epochs
+    run_opts = trial_options(opts, params)
+    features = open_feature_matrix(features_path)
+    (fit_rows, validation_rows, _) = trial_rows(len(features), run_opts)
+    (fit_dataset, validation_dataset) = make_windowed_datasets(
+        np.array(features[fit_rows]), np.array(features[validation_rows]), run_opts
+    )
+
+    tf.keras.backend.clear_session()
+    if initial_epoch > 0 and os.path.exists(checkpoint_path(trial_id, initial_epoch)):
+        model = tf.keras.models.load_model(checkpoint_path(trial_id, initial_epoch))
+    else:
+        (initial_epoch, model) = (0, compile_model(build_model(run_opts), run_opts))
+
+    history = model.fit(
+        fit_dataset,
+        initial_epoch=initial_epoch,
+        epochs=epochs,
+        validation_data=validation_dataset,
+        verbose=0,
+    )
+    model.save(checkpoint_path(trial_id, epochs))
+    if initial_epoch > 0:
+        remove_checkpoint(trial_id, initial_epoch)
+
+    return float(history.history["val_loss"][-1])
+
+
+def test_trial(
+    trial_id: str,
+    params: Dict[str, int],
+    epochs: int,
+    features_path: str,
+    opts: LoadForecastOptions,
+) -> float:
+    """score a trained trial on the test rows, once the search has picked it
+    Args:
+      trial_id:     the trial name
+      params:       the trial's hyperparameters
+      epochs:       epochs trained at the trial's checkpoint
+      features_path:    path to the memory-mapped feature matrix
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      test loss of the trial's checkpoint
+    """
+
+    run_opts = trial_options(opts, params)
+    features = open_feature_matrix(features_path)
+    (_, validation_rows, test_rows) = trial_rows(len(features), run_opts)
+    (_, test_dataset) = make_windowed_datasets(
+        np.array(features[validation_rows]), np.array(features[test_rows]), run_opts
+    )
+
+    tf.keras.backend.clear_session()
+    model = tf.keras.models.load_model(checkpoint_path(trial_id, epochs))
+
+    return float(model.evaluate(test_dataset, verbose=0, return_dict=True)["loss"])
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """load the records of finished trials
+    Args:
+      path:     history file path
+    Returns:
+      list of trial records, empty for a new search
+    """
+
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as history_file:
+        return json.load(history_file)
+
+
+def save_history(path: str, history: List[Dict[str, Any]]) -> None:
+    """write the trial records, replacing the file atomically
+    Args:
+      path:     history file path
+      history:  list of trial records
+    """
+
+    with open(f"{path}.tmp", "w", encoding="utf-8") as history_file:
+        json.dump(history, history_file, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+
+@dataclass
+class HyperbandRun:
+    """the brackets of one (possibly resumed) Hyperband search
+    Attributes:
+        executor:   worker pool the trials run in
+        features_path:  path to the memory-mapped feature matrix
+        opts:       LoadForecastOptions object for this run
+        history_path:   history file path
+        history:    records of the finished trials, saved after every trial
+    """
+
+    executor: Executor
+    features_path: str
+    opts: LoadForecastOptions
+    history_path: str
+    history: List[Dict[str, Any]]
+
+    def run_rung(
+        self, trials: Dict[str, Dict[str, int]], rung: Dict[str, int]
+    ) -> Dict[str, float]:
+        """train every trial of a rung that has not finished it yet
+        Args:
+            trials:     hyperparameters of each trial still in the bracket
+            rung:       bracket, rung, previous_epochs and epochs of the rung
+        Returns:
+            validation loss of each trial at the rung
+        """
+
+        finished = {
+            (record["trial_id"], record["epochs"]): record for record in self.history
+        }
+        futures = {
+            self.executor.submit(
+                run_trial,
+                trial_id,
+                params,
+                (rung["previous_epochs"], rung["epochs"]),
+                self.features_path,
+                self.opts,
+            ): trial_id
+            for trial_id, params in trials.items()
+            if (trial_id, rung["epochs"]) not in finished
+        }
+        for future in as_completed(futures):
+            record = {
+                "trial_id": futures[future],
+                "bracket": rung["bracket"],
+                "rung": rung["rung"],
+                "epochs": rung["epochs"],
+                "params": trials[futures[future]],
+                "val_loss": future.result(),
+            }
+            print(record)
+            finished[(record["trial_id"], rung["epochs"])] = record
+            self.history.append(record)
+            save_history(self.history_path, self.history)
+
+        return {
+            trial_id: finished[(trial_id, rung["epochs"])]["val_loss"]
+            for trial_id in trials
+        }
+
+    def run_bracket(self, bracket: int, n_trials: int, first_rung_epochs: int) -> None:
+        """start `n_trials` trials and keep the best 1/eta of them at every rung,
+        resuming the survivors from their checkpoints
+        Args:
+            bracket:    bracket number, also the number of rungs after the first
+            n_trials:   number of trials at the first rung
+            first_rung_epochs:  epochs given to every trial at the first rung
+        """
+
+        search_opts = self.opts["search"]
+        eta = search_opts["eta"]
+        rng = random.Random(search_opts["seed"] * 1000 + bracket)
+        trials = {
+            f"b{bracket}_t{trial}": sample_params(search_opts["space"], rng)
+            for trial in range(n_trials)
+        }
+        previous_epochs = 0
+
+        for rung in range(bracket + 1):
+            epochs = first_rung_epochs * eta**rung
+            rung_losses = self.run_rung(
+                trials,
+                {
+                    "bracket": bracket,
+                    "rung": rung,
+                    "previous_epochs": previous_epochs,
+                    "epochs": epochs,
+                },
+            )
+            survivors = sorted(trials, key=rung_losses.__getitem__)[
+                : max(len(trials) // eta, 1)
+            ]
+            for trial_id in set(trials) - set(survivors):
+                remove_checkpoint(trial_id, epochs)
+            trials = {trial_id: trials[trial_id] for trial_id in survivors}
+            previous_epochs = epochs
+
+    def best_trial(self) -> Dict[str, Any]:
+        """the trial with the lowest validation loss at the largest budget,
+        scored once on the test rows
+        Returns:
+            record of the best trial, with its test loss
+        """
+
+        max_budget = max(record["epochs"] for record in self.history)
+        best = min(
+            (record for record in self.history if record["epochs"] == max_budget),
+            key=lambda record: record["val_loss"],
+        )
+        test_loss = self.executor.submit(
+            test_trial,
+            best["trial_id"],
+            best["params"],
+            best["epochs"],
+            self.features_path,
+            self.opts,
+        ).result()
+
+        return {**best, "test_loss": test_loss}
+
+
+def hyperband_search(
+    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> Dict[str, Any]:
+    """run (or resume) a Hyperband search
+    each bracket starts many trials on a few epochs and keeps the best 1/eta of
+    them at every rung, resuming the survivors from their checkpoints
+    Args:
+      data:     scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      record of the trial with the lowest validation loss at the largest budget,
+      with its test loss
+    """
+
+    search_opts = opts["search"]
+    workers = search_opts["workers"]
+    threads = max((os.cpu_count() or 1) // workers, 1)
+
+    os.makedirs(SEARCH_OUT_PATH, exist_ok=True)
+    history_path = os.path.join(SEARCH_OUT_PATH, HISTORY_FILENAME)
+
+    features_path = os.path.join(MODEL_OUT_PATH, f"features{opts['zone']}.npy")
+    write_feature_matrix(data, features_path)
+
+    with worker_pool(opts, workers, threads) as executor:
+        search = HyperbandRun(
+            executor, features_path, opts, history_path, load_history(history_path)
+        )
+        for bracket, n_trials, first_rung_epochs in hyperband_brackets(
+            search_opts["max_epochs"], search_opts["eta"]
+        ):
+            search.run_bracket(bracket, n_trials, first_rung_epochs)
+
+        return search.best_trial()
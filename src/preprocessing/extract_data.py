@@ -4,16 +4,19 @@ import hashlib
 import os
 import sys
 from copy import deepcopy
-from typing import Union
+from typing import Iterator, Union
 from zipfile import ZipFile
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
 import pytz
 from dotenv.main import load_dotenv
 
 from config import DATA_PATH, PARQUET_FILENAME, PARQUET_ORIGINAL_FILENAME, ZIP_FILENAME
 from custom_types import DtIntervalSelection, LoadForecastOptions
+from preprocessing.repair import repair_hourly_array_chunks, repair_hourly_index
 
 
 class DataExtract:
@@ -109,13 +112,99 @@ class DataExtract:
 
         idx_locs = self._get_date_range_idx_locs(df_load_data.index, start, end)
 
-        feature_df = df_load_data.iloc[idx_locs].sort_index()
+        feature_df = df_load_data.iloc[idx_locs]
+
+        if opts.get("repair_index", False):
+            # the repair orders the rows itself with a stable sort, so duplicated
+            # fall-back hours keep their file order and out-of-order rows are counted
+            (feature_df, report) = repair_hourly_index(feature_df[[opts["zone"]]])
+            print(report)
+        else:
+            feature_df = feature_df.sort_index()
 
         if len(opts["additional_features"]) > 0:
             feature_df = self.add_features(feature_df)
 
         return feature_df[[opts["zone"], *opts["additional_features"]]]
 
+    def iter_parquet_chunks(
+        self, opts: LoadForecastOptions, chunk_rows: int
+    ) -> Iterator[pd.DataFrame]:
+        """read the parquet one record batch at a time, for data larger than RAM
+        each chunk is localized, limited to the train/test dates, repaired if
+        `repair_index` is set and given the additional features like
+        `load_data_from_parquet`; rows are expected in time order across chunks
+        Args:
+          opts:     a load forecast options object specified in config file
+          chunk_rows:   rows per record batch
+        Yields:
+          pandas dataframe of load and feature data for each non-empty chunk
+        """
+
+        chunks = self._iter_localized_chunks(opts, chunk_rows)
+        if opts.get("repair_index", False):
+            # the last rows of each chunk are carried into the next, so
+            # duplicates and gaps at chunk boundaries are repaired too
+            chunks = (
+                pd.DataFrame(
+                    values,
+                    index=pd.DatetimeIndex(grid, tz="UTC").tz_convert(
+                        opts["timezone_opts"]["timezone"]
+                    ),
+                    columns=[opts["zone"]],
+                )
+                for grid, values in repair_hourly_array_chunks(
+                    (pd.DatetimeIndex(chunk_df.index).asi8, chunk_df.to_numpy())
+                    for chunk_df in chunks
+                )
+            )
+
+        for chunk_df in chunks:
+            if len(opts["additional_features"]) > 0:
+                chunk_df = self.add_features(chunk_df)
+
+            yield chunk_df[[opts["zone"], *opts["additional_features"]]]
+
+    def _iter_localized_chunks(
+        self, opts: LoadForecastOptions, chunk_rows: int
+    ) -> Iterator[pd.DataFrame]:
+        """localized load data of each parquet record batch in the train/test dates
+        Args:
+          opts:     a load forecast options object specified in config file
+          chunk_rows:   rows per record batch
+        Yields:
+          datetime-indexed dataframe of the zone's load for each non-empty chunk
+        """
+
+        parquet_file = pq.ParquetFile(self.parquet_filepath)
+        index_column = parquet_file.schema_arrow.pandas_metadata["index_columns"][0]
+        timezone = pytz.timezone(opts["timezone_opts"]["timezone"])
+        start = timezone.localize(
+            self._convert_train_test_opts_to_dt(opts["train_test_dates"]["start"])
+        )
+        end = timezone.localize(
+            self._convert_train_test_opts_to_dt(opts["train_test_dates"]["end"])
+        )
+
+        for batch in parquet_file.iter_batches(
+            batch_size=chunk_rows, columns=[index_column, opts["zone"]]
+        ):
+            chunk_df = (
+                pa.Table.from_batches([batch])
+                .to_pandas(ignore_metadata=True)
+                .set_index(index_column)
+            )
+            chunk_df.index = pd.to_datetime(chunk_df.index).tz_localize(
+                opts["timezone_opts"]["timezone"],
+                ambiguous=opts["timezone_opts"]["ambiguous"],
+                nonexistent=opts["timezone_opts"]["nonexistent"],
+            )
+            chunk_df = chunk_df.iloc[
+                self._get_date_range_idx_locs(chunk_df.index, start, end)
+            ]
+            if not chunk_df.empty:
+                yield chunk_df
+
     @staticmethod
     def add_features(input_df: pd.DataFrame):
         """add features to the dataframe for multivariate model
@@ -128,15 +217,15 @@ class DataExtract:
         new_df = deepcopy(input_df)
 
         # get timestamps from index
-        timestamps = np.array(new_df.index.map(pd.Timestamp.timestamp).to_list())
+        timestamps = new_df.index.asi8 / 10**9
 
         new_df["sin_day"] = np.sin(timestamps * (2 * np.pi / 24 / 60 / 60))
         new_df["cos_day"] = np.cos(timestamps * (2 * np.pi / 24 / 60 / 60))
         new_df["sin_year"] = np.sin(timestamps * (2 * np.pi / 24 / 60 / 60 / 365.245))
         new_df["cos_year"] = np.cos(timestamps * (2 * np.pi / 24 / 60 / 60 / 365.245))
         days_of_week = new_df.index.to_series().dt.dayofweek
-        new_df["weekend"] = [1 if day < 5 else 0 for day in days_of_week]
-        new_df["dayofweek"] = [1 if day == 2 else 0 for day in days_of_week]
+        new_df["weekend"] = np.where(days_of_week < 5, 1, 0)
+        new_df["dayofweek"] = np.where(days_of_week == 2, 1, 0)
         new_df["hour"] = new_df.index.to_series().dt.hour
         new_df["dayofyear"] = new_df.index.to_series().dt.dayofyear
 
@@ -145,7 +234,7 @@ class DataExtract:
     def _get_date_range_idx_locs(
         self, dates: pd.DatetimeIndex, start: datetime.datetime, end: datetime.datetime
     ) -> pd.Index:
-        return pd.Index({idx for idx, date in enumerate(dates) if start <= date <= end})
+        return pd.Index(np.flatnonzero((dates >= start) & (dates <= end)))
 
     def _convert_train_test_opts_to_dt(self, dt_interval: DtIntervalSelection):
         """"""
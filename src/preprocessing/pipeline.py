@@ -0,0 +1,132 @@
+""" data preparation steps shared by the training, tuning and evaluation programs """
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import tensorflow as tf  # type: ignore
+from sklearn.preprocessing import MinMaxScaler  # type: ignore
+
+from custom_types import LoadForecastOptions
+from preprocessing.extract_data import DataExtract
+from preprocessing.scaler import scale_data
+from preprocessing.windowing import (
+    dataset_options,
+    make_window_arrays,
+    windowed_dataset_factory,
+)
+
+
+def load_scaled_data(
+    opts: LoadForecastOptions,
+    scaler: Optional[MinMaxScaler] = None,
+) -> Tuple[Union[pd.Series, pd.DataFrame], MinMaxScaler]:
+    """extract and load the model data, then scale it
+    Args:
+      opts:     LoadForecastOptions object for this run
+      scaler:   an already fitted scaler to keep fixed, or None to fit a new one
+    Returns:
+      scaled model data and the fitted scaler
+    """
+
+    data_extractor = DataExtract()
+
+    data_extractor.extract_data()
+
+    model_data = data_extractor.load_data_from_parquet(opts)
+
+    return scale_data(model_data, opts, scaler)
+
+
+def make_windowed_datasets(
+    train_data: Union[pd.Series, pd.DataFrame, tf.Tensor],
+    test_data: Union[pd.Series, pd.DataFrame, tf.Tensor],
+    opts: LoadForecastOptions,
+) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
+    """window the train and test splits (look-back windows + look-ahead horizons)
+    Args:
+      train_data:   training split, one row per interval
+      test_data:    test split, one row per interval
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      windowed training and test datasets
+    """
+
+    windowing = windowed_dataset_factory(
+        opts["window_opts"],
+        features=(1 + len(opts["additional_features"])),
+        performance=opts.get("performance"),
+    )
+
+    return (
+        windowing.make_windows(tf.data.Dataset.from_tensor_slices(train_data)),
+        windowing.make_windows(tf.data.Dataset.from_tensor_slices(test_data)),
+    )
+
+
+def make_fine_tune_dataset(
+    train_data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+) -> tf.data.Dataset:
+    """windowed dataset for warm-start retraining: every window ending in the
+    newest `recent_hours` of the training data plus a random replay sample of
+    older windows, so the model adapts without forgetting earlier seasons
+    Args:
+      train_data:   scaled training split, one row per interval
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      shuffled, batched windowed dataset
+    """
+
+    window_opts = opts["window_opts"]
+    total_len = window_opts["window"] + window_opts["horizon"]
+    rows = np.asarray(train_data, dtype=np.float32)
+
+    n_windows = len(rows) - total_len + 1
+    n_recent = min(opts["fine_tune"]["recent_hours"], n_windows)
+    n_replay = min(
+        int(n_recent * opts["fine_tune"]["replay_fraction"]), n_windows - n_recent
+    )
+
+    rng = np.random.default_rng()
+    starts = np.concatenate(
+        [
+            np.arange(n_windows - n_recent, n_windows),
+            rng.choice(n_windows - n_recent, size=n_replay, replace=False),
+        ]
+    )
+    (windows, horizons) = make_window_arrays(rows, window_opts, starts)
+
+    return (
+        tf.data.Dataset.from_tensor_slices((windows, horizons))
+        .shuffle(len(starts))
+        .batch(window_opts["batch_size"])
+        .prefetch(tf.data.AUTOTUNE)
+        .with_options(dataset_options(opts.get("performance")))
+    )
+
+
+def write_feature_matrix(data: Union[pd.Series, pd.DataFrame], path: str) -> None:
+    """write the scaled model data to a .npy file that worker processes
+    can memory-map instead of re-extracting it
+    Args:
+      data:     scaled model data, one row per interval
+      path:     .npy file path
+    """
+
+    values = np.asarray(data, dtype=np.float32)
+    feature_matrix = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=values.shape
+    )
+    feature_matrix[:] = values
+    feature_matrix.flush()
+
+
+def open_feature_matrix(path: str) -> npt.NDArray:
+    """memory-map a feature matrix written by `write_feature_matrix`, read-only
+    Args:
+      path:     .npy file path
+    Returns:
+      read-only memory-mapped array, one row per interval
+    """
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,263 @@
+""" single-pass repair of the hourly time index before windowing
+out-of-order rows, duplicated (DST fall-back) hours and gaps (missing hours)
+would shift the fixed-stride windows, so they are fixed here on int64 UTC
+timestamps with NumPy diffs, on the whole index or chunk by chunk """
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+NS_PER_HOUR = 3600 * 10**9
+
+
+@dataclass
+class RepairReport:
+    """what the repair changed
+    Attributes:
+        rows_in:    rows before repair
+        rows_out:   rows after repair (one per hour from first to last)
+        out_of_order:   rows whose timestamp was earlier than the previous row's
+        off_grid:   timestamps rounded to the nearest whole hour
+        dst_shifted:    duplicated hours moved into an empty following hour
+                        (fall-back hours localized to the same instant)
+        duplicates_merged:  duplicated rows averaged into one
+        gaps_filled:    missing hours linearly interpolated
+    """
+
+    rows_in: int
+    rows_out: int
+    out_of_order: int
+    off_grid: int
+    dst_shifted: int
+    duplicates_merged: int
+    gaps_filled: int
+
+    def __str__(self) -> str:
+        return (
+            f"index repair: {self.rows_in} -> {self.rows_out} rows, "
+            f"{self.out_of_order} out of order, {self.off_grid} off the hour, "
+            f"{self.dst_shifted} DST hours shifted, "
+            f"{self.duplicates_merged} duplicates merged, "
+            f"{self.gaps_filled} gaps filled"
+        )
+
+
+def repair_hourly_arrays(
+    timestamps: npt.NDArray[np.int64], values: npt.NDArray
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray, RepairReport]:
+    """put rows on a complete, strictly increasing hourly grid
+    Args:
+        timestamps: int64 UTC nanoseconds, one per row
+        values:     float array of shape (rows, columns)
+    Returns:
+        (hourly timestamps, repaired values, report)
+    """
+
+    rows_in = len(timestamps)
+    values = np.asarray(values, dtype=np.float64)
+    if rows_in == 0:
+        return (timestamps, values, RepairReport(0, 0, 0, 0, 0, 0, 0))
+
+    (timestamps, values, out_of_order, off_grid) = _order_and_snap(timestamps, values)
+    (timestamps, dst_shifted) = _shift_fall_back_hours(timestamps)
+    (timestamps, values, duplicates_merged) = _merge_duplicates(timestamps, values)
+    (grid, values) = _fill_gaps(timestamps, values)
+
+    return (
+        grid,
+        values,
+        RepairReport(
+            rows_in=rows_in,
+            rows_out=len(grid),
+            out_of_order=out_of_order,
+            off_grid=off_grid,
+            dst_shifted=dst_shifted,
+            duplicates_merged=duplicates_merged,
+            gaps_filled=len(grid) - len(timestamps),
+        ),
+    )
+
+
+def _order_and_snap(
+    timestamps: npt.NDArray[np.int64], values: npt.NDArray
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray, int, int]:
+    """sort the rows by time (stable, so duplicates keep their file order) and
+    round the timestamps to whole hours
+    Args:
+        timestamps: int64 UTC nanoseconds, one per row
+        values:     float array of shape (rows, columns)
+    Returns:
+        (timestamps, values, rows out of order, timestamps off the hour)
+    """
+
+    out_of_order = int(np.count_nonzero(np.diff(timestamps) < 0))
+    if out_of_order:
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        values = values[order]
+
+    snapped = (timestamps + NS_PER_HOUR // 2) // NS_PER_HOUR * NS_PER_HOUR
+    off_grid = int(np.count_nonzero(snapped != timestamps))
+
+    return (snapped, values, out_of_order, off_grid)
+
+
+def _shift_fall_back_hours(
+    timestamps: npt.NDArray[np.int64],
+) -> Tuple[npt.NDArray[np.int64], int]:
+    """a repeated hour followed by a one-hour hole is a fall-back hour
+    localized to the same instant twice: move the repeat into the hole
+    Args:
+        timestamps: sorted whole-hour int64 UTC nanoseconds
+    Returns:
+        (timestamps, number of repeats moved)
+    """
+
+    steps = np.diff(timestamps)
+    repeats = np.flatnonzero(steps[:-1] == 0) + 1
+    dst = repeats[steps[repeats] == 2 * NS_PER_HOUR]
+    timestamps = timestamps.copy()
+    timestamps[dst] += NS_PER_HOUR
+
+    return (timestamps, len(dst))
+
+
+def _merge_duplicates(
+    timestamps: npt.NDArray[np.int64], values: npt.NDArray
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray, int]:
+    """average the rows that share a timestamp
+    Args:
+        timestamps: sorted whole-hour int64 UTC nanoseconds
+        values:     float array of shape (rows, columns)
+    Returns:
+        (distinct timestamps, their values, number of rows merged away)
+    """
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(timestamps)) + 1])
+    counts = np.diff(np.append(starts, len(timestamps)))
+    duplicates_merged = int(len(timestamps) - len(starts))
+    if duplicates_merged:
+        values = np.add.reduceat(values, starts, axis=0) / counts[:, None]
+
+    return (timestamps[starts], values, duplicates_merged)
+
+
+def _fill_gaps(
+    timestamps: npt.NDArray[np.int64], values: npt.NDArray
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray]:
+    """linearly interpolate the missing hours
+    Args:
+        timestamps: strictly increasing whole-hour int64 UTC nanoseconds
+        values:     float array of shape (rows, columns)
+    Returns:
+        (hourly timestamps from first to last, values on them)
+    """
+
+    grid = np.arange(timestamps[0], timestamps[-1] + 1, NS_PER_HOUR, dtype=np.int64)
+    if len(grid) == len(timestamps):
+        return (grid, values)
+
+    filled = np.empty((len(grid), values.shape[1]), dtype=np.float64)
+    present = (timestamps - grid[0]) // NS_PER_HOUR
+    missing = np.ones(len(grid), dtype=bool)
+    missing[present] = False
+    filled[present] = values
+    for column in range(values.shape[1]):
+        filled[missing, column] = np.interp(
+            grid[missing], timestamps, values[:, column]
+        )
+
+    return (grid, filled)
+
+
+def repair_hourly_index(df: pd.DataFrame) -> Tuple[pd.DataFrame, RepairReport]:
+    """repair a dataframe with a tz-aware hourly datetime index
+    Args:
+        df:     datetime-indexed dataframe of numeric columns
+    Returns:
+        repaired dataframe, in the same timezone, and the repair report
+    """
+
+    index = pd.DatetimeIndex(df.index)
+    (grid, values, report) = repair_hourly_arrays(index.asi8, df.to_numpy())
+
+    repaired = pd.DataFrame(
+        values,
+        index=pd.DatetimeIndex(grid, tz="UTC").tz_convert(index.tz),
+        columns=df.columns,
+    )
+
+    return (repaired, report)
+
+
+def repair_hourly_array_chunks(
+    chunks: Iterable[Tuple[npt.NDArray[np.int64], npt.NDArray]]
+) -> Iterator[Tuple[npt.NDArray[np.int64], npt.NDArray]]:
+    """`repair_hourly_arrays` over a stream of time-ordered chunks
+    the rows of the last two hours of each chunk are carried into the next and
+    only the hours before them are yielded, since a duplicated fall-back hour
+    is only recognized by the row after it; the last yielded row is repaired
+    again with the carry, so that a gap across the chunk boundary is
+    interpolated
+    Args:
+        chunks:     (int64 UTC nanoseconds, values of shape (rows, columns))
+    Yields:
+        (hourly timestamps, repaired values) continuing the previous chunk's grid
+    """
+
+    carry: Optional[Tuple[npt.NDArray[np.int64], npt.NDArray]] = None
+    anchor: Optional[Tuple[npt.NDArray[np.int64], npt.NDArray]] = None
+
+    for timestamps, values in chunks:
+        values = np.asarray(values, dtype=np.float64)
+        if carry is not None:
+            timestamps = np.concatenate([carry[0], timestamps])
+            values = np.concatenate([carry[1], values])
+        snapped = (timestamps + NS_PER_HOUR // 2) // NS_PER_HOUR * NS_PER_HOUR
+        hours = np.unique(snapped)
+        carry = (timestamps, values)
+        if len(hours) < 2:
+            continue
+
+        (grid, repaired) = _repair_after(anchor, timestamps, values)
+        settled = grid < hours[-2]
+        held = snapped >= hours[-2]
+        carry = (timestamps[held], values[held])
+        if settled.any():
+            anchor = (grid[settled][-1:], repaired[settled][-1:])
+            yield (grid[settled], repaired[settled])
+
+    if carry is not None and len(carry[0]):
+        (grid, repaired) = _repair_after(anchor, *carry)
+        if len(grid):
+            yield (grid, repaired)
+
+
+def _repair_after(
+    anchor: Optional[Tuple[npt.NDArray[np.int64], npt.NDArray]],
+    timestamps: npt.NDArray[np.int64],
+    values: npt.NDArray,
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray]:
+    """repair rows following an already repaired `anchor` row, if any
+    Args:
+        anchor:     last repaired (timestamp, values) row of the previous chunk
+        timestamps: int64 UTC nanoseconds, one per row
+        values:     float array of shape (rows, columns)
+    Returns:
+        (hourly timestamps after the anchor, repaired values)
+    """
+
+    if anchor is not None:
+        timestamps = np.concatenate([anchor[0], timestamps])
+        values = np.concatenate([anchor[1], values])
+    (grid, repaired, _) = repair_hourly_arrays(timestamps, values)
+    if anchor is None:
+        return (grid, repaired)
+
+    after = grid > anchor[0][0]
+    return (grid[after], repaired[after])
@@ -1,26 +1,65 @@
 """ function for applying scaling transformation to model data """
-from typing import Tuple, Union
+import os
+import pickle
+from typing import Optional, Tuple, Union
 
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler  # type: ignore
 
+from config import MODEL_OUT_PATH
 from custom_types import LoadForecastOptions
 
 
 def scale_data(
-    data: Union[pd.Series, pd.DataFrame], opts: LoadForecastOptions
+    data: Union[pd.Series, pd.DataFrame],
+    opts: LoadForecastOptions,
+    scaler: Optional[MinMaxScaler] = None,
 ) -> Tuple[Union[pd.Series, pd.DataFrame], MinMaxScaler]:
     """scale the input data using the sklearn MinMaxScaler
     Args:
       data:  pd.Series or pd.DataFrame of model data
       opts:  LoadForecastOptions object
+      scaler:   an already fitted scaler to keep fixed, or None to fit a new one
     Returs:
       data:  pandas object with load column scaled
       scaler:   MinMaxScaler object with method to invert transform
     """
 
-    scaler = MinMaxScaler()
-
-    data[opts["zone"]] = scaler.fit_transform(data[[opts["zone"]]])  # type: ignore
+    if scaler is None:
+        scaler = MinMaxScaler()
+        data[opts["zone"]] = scaler.fit_transform(data[[opts["zone"]]])  # type: ignore
+    else:
+        data[opts["zone"]] = scaler.transform(data[[opts["zone"]]])  # type: ignore
 
     return (data, scaler)
+
+
+def scaler_filepath(opts: LoadForecastOptions) -> str:
+    """the path to the saved scaler for this zone
+    Args:
+      opts:  LoadForecastOptions object
+    Returns:
+      filepath in string format
+    """
+    return os.path.join(MODEL_OUT_PATH, f"scaler{opts['zone']}.pkl")
+
+
+def save_scaler(scaler: MinMaxScaler, opts: LoadForecastOptions) -> None:
+    """save the fitted scaler so warm-started runs scale data the same way
+    Args:
+      scaler:   fitted MinMaxScaler object
+      opts:  LoadForecastOptions object
+    """
+    with open(scaler_filepath(opts), "wb") as scaler_file:
+        pickle.dump(scaler, scaler_file)
+
+
+def load_scaler(opts: LoadForecastOptions) -> MinMaxScaler:
+    """load the scaler saved by the last full training run
+    Args:
+      opts:  LoadForecastOptions object
+    Returns:
+      fitted MinMaxScaler object
+    """
+    with open(scaler_filepath(opts), "rb") as scaler_file:
+        return pickle.load(scaler_file)
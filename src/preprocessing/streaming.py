@@ -0,0 +1,154 @@
+""" out-of-core scaling and windowing for histories larger than RAM
+a first chunked pass over the parquet fits the scaler and counts rows, then
+training and test windows are generated chunk by chunk, carrying the last
+`window + horizon - 1` rows of each chunk into the next so that no window
+crossing a chunk boundary is lost """
+
+from typing import Iterator, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import tensorflow as tf  # type: ignore
+from sklearn.preprocessing import MinMaxScaler  # type: ignore
+
+from custom_types import LoadForecastOptions
+from preprocessing.extract_data import DataExtract
+from preprocessing.windowing import dataset_options, make_window_arrays
+
+
+def fit_streaming_scaler(
+    opts: LoadForecastOptions,
+) -> Tuple[MinMaxScaler, int]:
+    """fit the scaler with `partial_fit` in one chunked pass over the parquet
+    Args:
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      fitted MinMaxScaler object and the number of rows in the train/test dates
+    """
+
+    scaler = MinMaxScaler()
+    n_rows = 0
+
+    for chunk_df in DataExtract().iter_parquet_chunks(
+        opts, opts["streaming"]["chunk_rows"]
+    ):
+        scaler.partial_fit(chunk_df[[opts["zone"]]])
+        n_rows += len(chunk_df)
+
+    return (scaler, n_rows)
+
+
+def scaled_row_chunks(
+    opts: LoadForecastOptions, scaler: MinMaxScaler, start: int, stop: int
+) -> Iterator[npt.NDArray]:
+    """scaled rows [start, stop) of the train/test dates, one chunk at a time
+    Args:
+      opts:     LoadForecastOptions object for this run
+      scaler:   fitted MinMaxScaler object
+      start:    first row
+      stop:     row after the last one
+    Yields:
+      float32 arrays of shape (rows, features), like the in-memory data
+    """
+
+    chunk_start = 0
+    for chunk_df in DataExtract().iter_parquet_chunks(
+        opts, opts["streaming"]["chunk_rows"]
+    ):
+        chunk_stop = chunk_start + len(chunk_df)
+        if chunk_stop > start:
+            chunk_df = chunk_df.iloc[
+                max(start - chunk_start, 0) : max(stop - chunk_start, 0)
+            ].copy()
+            chunk_df[opts["zone"]] = scaler.transform(chunk_df[[opts["zone"]]])
+            yield np.asarray(chunk_df, dtype=np.float32)
+        if chunk_stop >= stop:
+            return
+        chunk_start = chunk_stop
+
+
+def window_batches(
+    chunks: Iterator[npt.NDArray], opts: LoadForecastOptions
+) -> Iterator[Tuple[npt.NDArray, npt.NDArray]]:
+    """window a stream of row chunks, carrying the overlap between chunks
+    Args:
+      chunks:   consecutive row chunks
+      opts:     LoadForecastOptions object for this run
+    Yields:
+      (look-back windows, horizons) of up to `batch_size` windows
+    """
+
+    window_opts = opts["window_opts"]
+    overlap = window_opts["window"] + window_opts["horizon"] - 1
+    batch_size = window_opts["batch_size"]
+    carry = None
+
+    for chunk in chunks:
+        rows = chunk if carry is None else np.concatenate([carry, chunk])
+        if len(rows) > overlap:
+            (windows, horizons) = make_window_arrays(rows, window_opts)
+            for batch_start in range(0, len(windows), batch_size):
+                yield (
+                    np.array(windows[batch_start : batch_start + batch_size]),
+                    np.array(horizons[batch_start : batch_start + batch_size]),
+                )
+        carry = rows[-overlap:]
+
+
+def streaming_dataset(
+    opts: LoadForecastOptions, scaler: MinMaxScaler, start: int, stop: int
+) -> tf.data.Dataset:
+    """windowed dataset read from the parquet on every pass, in bounded memory
+    Args:
+      opts:     LoadForecastOptions object for this run
+      scaler:   fitted MinMaxScaler object
+      start:    first row
+      stop:     row after the last one
+    Returns:
+      batched windowed dataset, shuffled within `shuffle_buffer_size` if set
+    """
+
+    window_opts = opts["window_opts"]
+    features = 1 + len(opts["additional_features"])
+
+    dataset = tf.data.Dataset.from_generator(
+        lambda: window_batches(scaled_row_chunks(opts, scaler, start, stop), opts),
+        output_signature=(
+            tf.TensorSpec(
+                shape=(None, window_opts["window"], features), dtype=tf.float32
+            ),
+            tf.TensorSpec(shape=(None, window_opts["horizon"]), dtype=tf.float32),
+        ),
+    )
+
+    if "shuffle_buffer_size" in window_opts:
+        dataset = (
+            dataset.unbatch()
+            .shuffle(window_opts["shuffle_buffer_size"])
+            .batch(window_opts["batch_size"])
+        )
+
+    return dataset.prefetch(tf.data.AUTOTUNE).with_options(
+        dataset_options(opts.get("performance"))
+    )
+
+
+def streaming_windowed_datasets(
+    opts: LoadForecastOptions,
+) -> Tuple[tf.data.Dataset, tf.data.Dataset, MinMaxScaler]:
+    """streaming train/test datasets split at `train_pct`, like
+    `train_test_split` followed by `make_windowed_datasets`
+    Args:
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      windowed training and test datasets, and the fitted scaler
+    """
+
+    (scaler, n_rows) = fit_streaming_scaler(opts)
+    test_start_idx = int(n_rows * opts["train_pct"])
+
+    return (
+        streaming_dataset(opts, scaler, 0, test_start_idx),
+        streaming_dataset(opts, scaler, test_start_idx, n_rows),
+        scaler,
+    )
@@ -1,6 +1,7 @@
 """ train-test split for time series forecast """
 
-from typing import Tuple, Union
+import sys
+from typing import List, Tuple, Union
 
 import pandas as pd
 
@@ -19,10 +20,98 @@ def train_test_split(
       Tuple containing train/test data split at the approp. index
     """
 
-    test_start_idx = int(len(series) * opts["train_pct"])
+    (train_rows, test_rows) = train_test_rows(len(series), opts)
 
-    train_data = series[:test_start_idx]
+    train_data = series[train_rows]
 
-    test_data = series[test_start_idx:]
+    test_data = series[test_rows]
 
     return train_data, test_data
+
+
+def train_test_rows(n_rows: int, opts: LoadForecastOptions) -> Tuple[slice, slice]:
+    """row slices of the train/test split, for arrays such as the memory-mapped
+    feature matrix
+    Args:
+      n_rows:   number of rows in the scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      (train slice, test slice) split at the approp. index
+    """
+
+    test_start_idx = int(n_rows * opts["train_pct"])
+
+    return (slice(0, test_start_idx), slice(test_start_idx, n_rows))
+
+
+def rolling_origin_splits(
+    n_rows: int, opts: LoadForecastOptions
+) -> List[Tuple[slice, slice]]:
+    """row slices for rolling/expanding-origin cross-validation
+    the rows after the first `train_pct` share are cut into consecutive test folds;
+    each fold trains on the rows before its origin (all of them for "expanding",
+    the last `train_pct` share for "rolling") and its test slice starts one
+    look-back window early so the first test horizon begins at the origin
+    Args:
+      n_rows:   number of rows in the scaled model data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      list of (train slice, test slice) tuples, one per fold
+    Raises:
+      SystemExit if the folds, or the early-stopping share of their training
+      rows, are too short to hold a window and horizon
+    """
+
+    folds = opts["cross_validation"]["folds"]
+    window = opts["window_opts"]["window"]
+    horizon = opts["window_opts"]["horizon"]
+
+    initial_train_len = int(n_rows * opts["train_pct"])
+    fold_len = (n_rows - initial_train_len) // folds
+    fit_len = int(initial_train_len * opts["train_pct"])
+
+    if (
+        fold_len < horizon
+        or fit_len < window + horizon
+        or initial_train_len - fit_len < horizon
+    ):
+        raise sys.exit(
+            f"""
+            Invalid options.
+            {folds} cross-validation folds of {fold_len} rows are too short
+            for a {window} interval window and {horizon} interval horizon.
+            Exiting now.
+            """
+        )
+
+    splits = []
+    for fold in range(folds):
+        origin = initial_train_len + fold * fold_len
+        train_start = 0
+        if opts["cross_validation"]["mode"] == "rolling":
+            train_start = origin - initial_train_len
+        splits.append(
+            (slice(train_start, origin), slice(origin - window, origin + fold_len))
+        )
+
+    return splits
+
+
+def validation_split(rows: slice, opts: LoadForecastOptions) -> Tuple[slice, slice]:
+    """split a fold's training rows into fitting and early-stopping rows, so
+    the fold's test rows stay unseen until it is scored
+    the last `1 - train_pct` share of the rows validates, starting one
+    look-back window early like the test slices
+    Args:
+      rows:     row slice of the fold's training data
+      opts:     LoadForecastOptions object for this run
+    Returns:
+      (fitting slice, validation slice)
+    """
+
+    validation_start = rows.start + int((rows.stop - rows.start) * opts["train_pct"])
+
+    return (
+        slice(rows.start, validation_start),
+        slice(validation_start - opts["window_opts"]["window"], rows.stop),
+    )
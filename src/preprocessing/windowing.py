@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Union
+from typing import Optional, Tuple, Union
 
+import numpy as np
+import numpy.typing as npt
 import tensorflow as tf  # type: ignore
 
-from custom_types import WindowedDatasetOpts
+from custom_types import PerformanceOpts, WindowedDatasetOpts
 
 
 class WindowOptionsValidationError(Exception):
@@ -38,6 +40,57 @@ def validate_options(opts: WindowedDatasetOpts):
         )
 
 
+def dataset_options(performance: Optional[PerformanceOpts]) -> tf.data.Options:
+    """tf.data options for windowed datasets
+    Args:
+      performance:  performance options object, or None for TF defaults
+    Returns:
+      tf.data.Options object
+    """
+
+    options = tf.data.Options()
+    if performance is None:
+        return options
+
+    options.deterministic = performance["deterministic"]
+    if performance["private_threadpool_size"] > 0:
+        options.threading.private_threadpool_size = performance[
+            "private_threadpool_size"
+        ]
+
+    return options
+
+
+def make_window_arrays(
+    data: npt.NDArray,
+    opts: WindowedDatasetOpts,
+    starts: Optional[npt.NDArray] = None,
+) -> Tuple[npt.NDArray, npt.NDArray]:
+    """NumPy equivalent of `make_windows` before batching: same windows, same
+    (look-back, horizon) layout, the horizon holding only the load column
+    for multivariate data
+    Args:
+        data:   un-windowed rows, shape (intervals,) or (intervals, features)
+        opts:   windowing options object
+        starts: row indices of the windows to keep, or None for every window
+    Returns:
+        (windows, horizons) arrays; views into `data` when `starts` is None
+    """
+
+    total_len = opts["window"] + opts["horizon"]
+    windows = np.lib.stride_tricks.sliding_window_view(data, total_len, axis=0)
+    if data.ndim > 1:
+        windows = np.moveaxis(windows, -1, 1)
+    if starts is not None:
+        windows = windows[starts]
+
+    horizons = windows[:, opts["window"] :]
+    if data.ndim > 1:
+        horizons = horizons[..., 0]
+
+    return (windows[:, : opts["window"]], horizons)
+
+
 @dataclass
 class WindowedDataset:
     """class for unshuffled windowed dataset objects
@@ -46,9 +99,11 @@ class WindowedDataset:
         total_len:  lag window + forecast horizon (intervals)
         horizon:    forecast horizon
         batch_size: dataset batch size
+        performance: tf.data performance options
     """
 
     opts: WindowedDatasetOpts
+    performance: Optional[PerformanceOpts] = None
 
     def __post_init__(self):
         validate_options(self.opts)
@@ -68,9 +123,13 @@ class WindowedDataset:
         return (
             dataset.window(self.total_len, shift=1, drop_remainder=True)
             .flat_map(lambda series: series.batch(self.total_len))
-            .map(lambda win: (win[: -self.horizon], win[-self.horizon :]))
+            .map(
+                lambda win: (win[: -self.horizon], win[-self.horizon :]),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
             .batch(self.batch_size)
             .prefetch(tf.data.AUTOTUNE)
+            .with_options(dataset_options(self.performance))
         )
 
 
@@ -82,9 +141,11 @@ class WindowedDatasetMultivar:
         total_len:  lag window + forecast horizon (intervals)
         horizon:    forecast horizon
         batch_size: dataset batch size
+        performance: tf.data performance options
     """
 
     opts: WindowedDatasetOpts
+    performance: Optional[PerformanceOpts] = None
 
     def __post_init__(self):
         validate_options(self.opts)
@@ -104,9 +165,13 @@ class WindowedDatasetMultivar:
         return (
             dataset.window(self.total_len, shift=1, drop_remainder=True)
             .flat_map(lambda series: series.batch(self.total_len))
-            .map(lambda win: (win[: -self.horizon], win[-self.horizon :, 0]))
+            .map(
+                lambda win: (win[: -self.horizon], win[-self.horizon :, 0]),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
             .batch(self.batch_size)
             .prefetch(tf.data.AUTOTUNE)
+            .with_options(dataset_options(self.performance))
         )
 
 
@@ -119,9 +184,11 @@ class ShuffledWindowedDataset:
         horizon:    forecast horizon
         batch_size: dataset batch size
         shuffle_buffer: buffer size for shuffling
+        performance: tf.data performance options
     """
 
     opts: WindowedDatasetOpts
+    performance: Optional[PerformanceOpts] = None
 
     def __post_init__(self):
         validate_options(self.opts)
@@ -142,10 +209,14 @@ class ShuffledWindowedDataset:
         return (
             dataset.window(self.total_len, shift=1, drop_remainder=True)
             .flat_map(lambda series: series.batch(self.total_len))
-            .shuffle(self.shuffle_buffer)
-            .map(lambda win: (win[: -self.horizon], win[-self.horizon :]))
+            .shuffle(self.shuffle_buffer, seed=self.opts.get("shuffle_seed"))
+            .map(
+                lambda win: (win[: -self.horizon], win[-self.horizon :]),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
             .batch(self.batch_size)
             .prefetch(tf.data.AUTOTUNE)
+            .with_options(dataset_options(self.performance))
         )
 
 
@@ -158,9 +229,11 @@ class ShuffledWindowedDatasetMultivar:
         horizon:    forecast horizon
         batch_size: dataset batch size
         shuffle_buffer: buffer size for shuffling
+        performance: tf.data performance options
     """
 
     opts: WindowedDatasetOpts
+    performance: Optional[PerformanceOpts] = None
 
     def __post_init__(self):
         validate_options(self.opts)
@@ -181,15 +254,21 @@ class ShuffledWindowedDatasetMultivar:
         return (
             dataset.window(self.total_len, shift=1, drop_remainder=True)
             .flat_map(lambda series: series.batch(self.total_len))
-            .shuffle(self.shuffle_buffer)
-            .map(lambda win: (win[: -self.horizon], win[-self.horizon :, 0]))
+            .shuffle(self.shuffle_buffer, seed=self.opts.get("shuffle_seed"))
+            .map(
+                lambda win: (win[: -self.horizon], win[-self.horizon :, 0]),
+                num_parallel_calls=tf.data.AUTOTUNE,
+            )
             .batch(self.batch_size)
             .prefetch(tf.data.AUTOTUNE)
+            .with_options(dataset_options(self.performance))
         )
 
 
 def windowed_dataset_factory(
-    opts: WindowedDatasetOpts, features: int
+    opts: WindowedDatasetOpts,
+    features: int,
+    performance: Optional[PerformanceOpts] = None,
 ) -> Union[
     WindowedDataset,
     ShuffledWindowedDataset,
@@ -200,14 +279,15 @@ def windowed_dataset_factory(
     Args:
         opts:   windowing options object
         features:   number of features
+        performance:    tf.data performance options
     Returns:
         windowed dataset, shuffled or unshuffled based on opts
     """
 
     if "shuffle_buffer_size" in opts.keys() and features > 1:
-        return ShuffledWindowedDatasetMultivar(opts)
+        return ShuffledWindowedDatasetMultivar(opts, performance)
     if "shuffle_buffer_size" in opts.keys():
-        return ShuffledWindowedDataset(opts)
+        return ShuffledWindowedDataset(opts, performance)
     if features > 1:
-        return WindowedDatasetMultivar(opts)
-    return WindowedDataset(opts)
+        return WindowedDatasetMultivar(opts, performance)
+    return WindowedDataset(opts, performance)
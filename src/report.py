@@ -0,0 +1,19 @@
+""" this module writes the headless diagnostic report for the saved model
+(or a baseline) without retraining """
+
+import os
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from model.performance import configure_runtime, get_performance_opts
+from model.reporting import write_report
+from preprocessing.pipeline import load_scaled_data
+from preprocessing.scaler import load_scaler, scaler_filepath
+
+if __name__ == "__main__":
+    configure_runtime(get_performance_opts(opts))
+
+    # the saved scaler keeps the plotted MW consistent with the trained model
+    saved_scaler = load_scaler(opts) if os.path.exists(scaler_filepath(opts)) else None
+    (scaled_model_data, scaler) = load_scaled_data(opts, saved_scaler)
+
+    write_report(scaled_model_data, scaler, opts)
@@ -0,0 +1,47 @@
+""" this module reports the data-parallel training speedup at 1/2/4/8 workers """
+
+import os
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from config import MODEL_OUT_PATH
+from model.distributed import train_distributed
+from preprocessing.pipeline import load_scaled_data, write_feature_matrix
+
+BENCHMARK_WORKERS = [1, 2, 4, 8]
+BENCHMARK_EPOCHS = 3  # the first epoch (tracing, cluster setup) is not timed
+BENCHMARK_STEPS = 50  # global steps per epoch
+
+if __name__ == "__main__":
+    (scaled_model_data, _) = load_scaled_data(opts)
+
+    features_path = os.path.join(MODEL_OUT_PATH, f"features{opts['zone']}.npy")
+    write_feature_matrix(scaled_model_data, features_path)
+
+    windows_per_second = {}
+    for run, workers in enumerate(BENCHMARK_WORKERS):
+        run_opts = {
+            **opts,
+            "epochs": BENCHMARK_EPOCHS,
+            "distributed": {
+                **opts["distributed"],
+                "workers": workers,
+                # fresh ports so a run never waits on sockets of the previous one
+                "base_port": opts["distributed"]["base_port"] + 100 * run,
+            },
+        }
+        result = train_distributed(
+            features_path, run_opts, steps_per_epoch=BENCHMARK_STEPS  # type: ignore
+        )
+        windows_per_second[workers] = (
+            BENCHMARK_STEPS
+            * opts["window_opts"]["batch_size"]
+            * workers
+            / result["seconds_per_epoch"]
+        )
+
+    print(f"strategy: {opts['distributed']['strategy']}")
+    for workers, throughput in windows_per_second.items():
+        print(
+            f"{workers} workers: {throughput:10.1f} windows/s, "
+            f"speedup {throughput / windows_per_second[BENCHMARK_WORKERS[0]]:.2f}x"
+        )
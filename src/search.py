@@ -0,0 +1,21 @@
+""" this module runs (or resumes) the Hyperband hyperparameter search
+and writes the best trial to the out/search folder """
+
+import json
+import os
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from model.search import SEARCH_OUT_PATH, hyperband_search
+from preprocessing.pipeline import load_scaled_data
+
+if __name__ == "__main__":
+    (scaled_model_data, _) = load_scaled_data(opts)
+
+    best_trial = hyperband_search(scaled_model_data, opts)
+
+    print(f"best trial: {best_trial}")
+
+    with open(
+        os.path.join(SEARCH_OUT_PATH, "best.json"), "w", encoding="utf-8"
+    ) as best_file:
+        json.dump(best_trial, best_file, indent=4)
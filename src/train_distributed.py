@@ -0,0 +1,19 @@
+""" this module trains the forecast model data-parallel across local worker
+processes (or logical CPU devices) using the `distributed` options """
+
+import os
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from config import MODEL_OUT_PATH
+from model.distributed import train_distributed
+from preprocessing.pipeline import load_scaled_data, write_feature_matrix
+from preprocessing.scaler import save_scaler
+
+if __name__ == "__main__":
+    (scaled_model_data, scaler) = load_scaled_data(opts)
+    save_scaler(scaler, opts)
+
+    features_path = os.path.join(MODEL_OUT_PATH, f"features{opts['zone']}.npy")
+    write_feature_matrix(scaled_model_data, features_path)
+
+    print(train_distributed(features_path, opts))
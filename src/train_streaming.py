@@ -0,0 +1,32 @@
+""" this module trains the forecast model out-of-core: the scaler is fitted in
+one chunked pass over the parquet and windows are streamed from it on every
+epoch, so peak memory does not depend on the length of the history """
+
+from config import FORECAST_OPTIONS_OBJECT as opts
+from custom_types import LoadForecastOptions, ReportOpts
+from model.model import run_model
+from model.performance import configure_runtime, get_performance_opts
+from preprocessing.extract_data import DataExtract
+from preprocessing.streaming import streaming_windowed_datasets
+
+if __name__ == "__main__":
+    # thread pools and precision policy must be set before any TF op runs
+    configure_runtime(get_performance_opts(opts))
+
+    DataExtract().extract_data()
+
+    (
+        windowed_training_dataset,
+        windowed_test_dataset,
+        scaler,
+    ) = streaming_windowed_datasets(opts)
+
+    # the interactive plot would load the whole test set into memory
+    report_opts: ReportOpts = (
+        {**opts["report"], "headless": True}
+        if "report" in opts
+        else {"headless": True, "samples": 0, "workers": 1}
+    )
+    streaming_opts: LoadForecastOptions = {**opts, "report": report_opts}
+
+    run_model(streaming_opts, windowed_training_dataset, windowed_test_dataset, scaler)